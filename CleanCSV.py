@@ -1,22 +1,46 @@
 # CleanCSV.py
 from __future__ import annotations
 
+import codecs
 import csv
 import hashlib
+import html
+import io
 import json
 import logging
+import math
 import os
 import re
+import secrets
+import shutil
+import threading
 import time
-import uuid
-from collections import defaultdict, deque
-from datetime import datetime, timedelta, timezone
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, List
+from typing import Any
 
+import numpy as np
 import pandas as pd
 import stripe
-from flask import Flask, abort, redirect, render_template_string, request, send_file
+from flask import Flask, Request, abort, redirect, render_template, request, send_file
+from markupsafe import Markup
+from werkzeug.utils import send_file as werkzeug_send_file
+
+# pyarrow and orjson are in requirements.txt; the fallbacks only keep bare installs working
+try:  # C-level CSV read/write and Arrow-backed string columns
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+    pa_csv = None
+
+try:  # faster manifest (de)serialization
+    import orjson
+except ImportError:
+    orjson = None
 
 app = Flask(__name__)
 
@@ -65,6 +89,11 @@ WORK_DIR.mkdir(parents=True, exist_ok=True)
 
 MAX_BYTES = int(os.environ.get("CLEANCCSV_MAX_BYTES", str(20 * 1024 * 1024)))
 RETENTION_MINUTES = int(os.environ.get("CLEANCCSV_RETENTION_MINUTES", "30"))
+CLEANUP_INTERVAL_SECONDS = int(os.environ.get("CLEANCCSV_CLEANUP_INTERVAL_SECONDS", "60"))
+
+# When set (e.g. "/_work/"), downloads are handed to nginx via X-Accel-Redirect;
+# that location must be `internal` and alias WORK_DIR
+X_ACCEL_PREFIX = os.environ.get("CLEANCCSV_X_ACCEL_PREFIX", "")
 
 MAX_ROWS = int(os.environ.get("CLEANCCSV_MAX_ROWS", "200000"))
 MAX_COLS = int(os.environ.get("CLEANCCSV_MAX_COLS", "300"))
@@ -72,6 +101,9 @@ MAX_COLS = int(os.environ.get("CLEANCCSV_MAX_COLS", "300"))
 RATE_WINDOW_SECONDS = int(os.environ.get("CLEANCCSV_RATE_WINDOW_SECONDS", "60"))
 RATE_MAX_UPLOADS = int(os.environ.get("CLEANCCSV_RATE_MAX_UPLOADS", "10"))
 
+# Threads used for per-column cleaning; Arrow string kernels release the GIL
+COLUMN_WORKERS = int(os.environ.get("CLEANCCSV_COLUMN_WORKERS", str(min(4, os.cpu_count() or 1))))
+
 stripe.api_key = os.environ.get("STRIPE_SECRET_KEY", "")
 PRICE_ID = os.environ.get("STRIPE_PRICE_ID", "")
 BASE_URL = os.environ.get("APP_BASE_URL", "http://127.0.0.1:5000")
@@ -80,1105 +112,168 @@ PAYMENTS_ENABLED = bool(stripe.api_key and PRICE_ID)
 
 SUPPORT_EMAIL = "carney.christopher22@gmail.com"
 
-_upload_hits = defaultdict(deque)
-
-# ============================
-# HTML
-# ============================
-INDEX_HTML = """
-<!doctype html>
-<html>
-<head>
-  <meta charset="utf-8" />
-  <title>CleanCSV — Repair malformed CSV files</title>
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-
-  <style>
-    body {
-      font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial, sans-serif;
-      margin: 0;
-      background: #fff;
-      color: #111;
-    }
-
-    /* Top utility header */
-    .topbar {
-      border-bottom: 1px solid #e5e7eb;
-      padding: 12px 20px;
-      font-size: 14px;
-      background: #fff;
-    }
-    .topbar a {
-      color: #666;
-      text-decoration: none;
-    }
-
-    .wrap {
-      max-width: 1200px;
-      margin: 0 auto;
-      padding: 20px 24px;
-    }
-
-    .hero {
-      display: grid;
-      grid-template-columns: 1fr 520px;
-      gap: 32px;
-      align-items: start;
-    }
-
-    @media (max-width: 900px) {
-      .hero {
-        grid-template-columns: 1fr;
-      }
-    }
-
-    h1 {
-      font-size: 34px;
-      line-height: 1.15;
-      margin: 0 0 8px;
-      letter-spacing: -0.01em;
-    }
-
-    .sub {
-      color: #555;
-      font-size: 16px;
-      margin: 0 0 14px;
-      line-height: 1.5;
-    }
-
-    .bullets {
-      padding-left: 18px;
-      margin: 0;
-    }
-    .bullets li {
-      margin: 8px 0;
-      font-size: 14px;
-      color: #444;
-    }
-
-    .card {
-      border: 1px solid #d1d5db;
-      border-radius: 6px;
-      padding: 16px;
-      background: #f9fafb;
-    }
-
-    .label {
-      font-size: 13px;
-      color: #666;
-      margin: 0 0 8px;
-    }
-
-    input[type=file] {
-      width: 100%;
-    }
-
-    .row {
-      margin-top: 14px;
-    }
-
-    .opt {
-      margin-top: 12px;
-    }
-
-    .opt .help {
-      font-size: 13px;
-      color: #666;
-      margin: 6px 0 0 22px;
-      line-height: 1.4;
-    }
-
-    .btn {
-      display: inline-block;
-      padding: 10px 14px;
-      border-radius: 4px;
-      border: 1px solid #374151;
-      background: #374151;
-      color: #fff;
-      cursor: pointer;
-      font-weight: 500;
-    }
-
-    .muted {
-      color: #666;
-      font-size: 14px;
-      line-height: 1.45;
-    }
-
-    .error {
-      color: #b00020;
-      white-space: pre-wrap;
-      margin: 12px 0 0;
-    }
-
-    footer {
-      border-top: 1px solid #f0f0f0;
-      margin-top: 28px;
-      padding-top: 18px;
-      color: #666;
-      font-size: 13px;
-      display: flex;
-      flex-wrap: wrap;
-      gap: 10px 18px;
-      justify-content: space-between;
-    }
-
-    .footer-left {
-      display: flex;
-      flex-wrap: wrap;
-      gap: 10px 18px;
-    }
-
-    .pill {
-      display: inline-block;
-      padding: 4px 10px;
-      border: 1px solid #e5e7eb;
-      border-radius: 999px;
-      font-size: 12px;
-      color: #444;
-      background: #fafafa;
-    }
-  </style>
-</head>
-
-<body>
-
-  <!-- Top utility header -->
-  <div class="topbar">
-    <strong>CleanCSV</strong>
-    <span style="color:#666; margin-left:12px;">CSV repair utility</span>
-    <span style="float:right;">
-      <a href="/problems">Problems</a>
-    </span>
-  </div>
-
-  <div class="wrap">
-    <div class="hero">
-
-      <!-- Left: context -->
-      <div>
-        <h1>Repair malformed CSV files</h1>
-
-        <p class="sub">
-          Fix delimiter, encoding, and row-structure issues so CSV files import correctly.
-          <br />
-          <strong>Handles European CSVs automatically</strong> (semicolon delimiters, decimal commas, localized number formats).
-        </p>
-
-        <ul class="bullets">
-          <li>Strict row normalization (every row matches the header)</li>
-          <li>Explicit delimiter detection (comma, semicolon, tab, pipe)</li>
-          <li>RFC-style handling of quoted multiline fields</li>
-        </ul>
-      </div>
-
-      <!-- Right: tool -->
-      <div class="card">
-        <p class="label"><strong>Process CSV</strong></p>
-
-        <form action="/upload" method="post" enctype="multipart/form-data">
-          <input type="file" name="file" required
-                 accept=".csv,.tsv,.txt,text/csv,text/tab-separated-values,text/plain" />
-
-          <div class="opt">
-            <label>
-              <input type="checkbox" name="near_dupes_preview" value="1" />
-              Preview near-duplicates (dry run)
-            </label>
-            <div class="help">Shows what would be removed without modifying the file.</div>
-          </div>
-
-          <div class="opt">
-            <label>
-              <input type="checkbox" name="near_dupes_remove" value="1" />
-              Remove near-duplicates
-            </label>
-            <div class="help">Removes rows identical after ignoring ID/date/balance fields.</div>
-          </div>
-
-          <div class="opt">
-            <label>
-              <input type="checkbox" name="normalize_numbers" value="1" />
-              Normalize numbers
-            </label>
-            <div class="help">Converts values like 1.234,56 → 1234.56 where safe.</div>
-          </div>
-
-          <div class="row">
-            <button class="btn" type="submit">Process file</button>
-          </div>
-        </form>
-
-        <p class="muted" style="margin-top:8px;">
-          Output: UTF-8 CSV with normalized structure
-        </p>
-
-        {% if error %}
-          <p class="error"><strong>Error:</strong> {{ error }}</p>
-        {% endif %}
-
-        <div class="row muted">
-          <span class="pill">Max {{ max_mb }} MB</span>
-          <span class="pill">{{ max_rows }} rows / {{ max_cols }} cols</span>
-        </div>
-
-        <p class="muted" style="margin-top:12px;">
-          {% if payments_enabled %}
-            Download requires a one-time fee.
-          {% else %}
-            Payments disabled. Downloads are free.
-          {% endif %}
-        </p>
-      </div>
-
-    </div>
-
-    <footer>
-      <div class="footer-left">
-        <span>Files are not stored.</span>
-        <span>Support: {{ support_email }}</span>
-        <span>CSV/TSV only</span>
-        <span><a href="/problems">Common CSV import problems</a></span>
-      </div>
-      <div>
-        <span class="pill">Secure checkout via Stripe</span>
-      </div>
-    </footer>
-
-  </div>
-</body>
-</html>
-"""
-PROBLEM_EXPECTED_FIELDS_HTML = """
-<!doctype html>
-<html>
-<head>
-  <meta charset="utf-8" />
-  <title>Fix CSV import error: “Expected 3 fields, saw 5”</title>
-  <meta name="description" content="Explanation of the CSV import error “Expected 3 fields, saw 5” and how to fix it by repairing inconsistent rows and malformed records." />
-  <link rel="canonical" href="{{ BASE_URL }}/problems/expected-fields-error" />
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <style>
-    body { font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial, sans-serif; margin: 0; background:#fff; color:#111; }
-    .wrap { max-width: 760px; margin: 0 auto; padding: 48px 20px; }
-    h1 { font-size: 32px; margin-bottom: 16px; }
-    p { line-height: 1.6; margin: 12px 0; }
-    ul { margin: 12px 0 16px 20px; }
-    pre {
-      background: #f8f8f8;
-      border: 1px solid #e5e7eb;
-      border-radius: 8px;
-      padding: 12px;
-      font-size: 13px;
-      overflow-x: auto;
-    }
-    .note {
-      background: #fafafa;
-      border-left: 4px solid #ddd;
-      padding: 12px;
-      margin: 20px 0;
-    }
-    .quiet-link {
-      margin-top: 28px;
-      font-size: 14px;
-    }
-  </style>
-</head>
-<body>
-  <div class="wrap">
-    <h1>Fix CSV import error: “Expected 3 fields, saw 5”</h1>
-
-    <p>
-      This error occurs when rows in a CSV file contain more columns than the header row.
-      Many tools stop importing when this happens.
-    </p>
-
-    <p>Common causes include:</p>
-    <ul>
-      <li>Extra delimiters inside text fields</li>
-      <li>Line breaks inside quoted values</li>
-      <li>Inconsistent exports from reporting tools</li>
-    </ul>
-
-    <p><b>Example of a broken CSV</b></p>
-
-    <pre>
-id,name,amount
-1,"ACME, Inc",100
-2,Widget,200,EXTRA
-    </pre>
-
-    <p><b>After repairing the file</b></p>
-
-    <pre>
-id,name,amount
-1,ACME, Inc,100
-2,Widget,200
-    </pre>
-
-    <div class="note">
-      The fix is to repair row structure so every row matches the header
-      and malformed records are stitched back together correctly.
-    </div>
-
-    <div class="quiet-link">
-      If you want to fix the file automatically, you can upload it here:
-      <a href="/">CleanCSV</a>
-    </div>
-  </div>
-</body>
-</html>
-"""
-
-PROBLEM_EXCEL_ONE_COLUMN_HTML = """
-<!doctype html>
-<html>
-<head>
-  <meta charset="utf-8" />
-  <title>Excel CSV opens in one column — wrong delimiter</title>
-  <meta name="description" content="Why Excel opens some CSV files in a single column and how to fix delimiter issues so data imports into separate columns correctly." />
-  <link rel="canonical" href="{{ BASE_URL }}/problems/excel-one-column-csv" />
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <style>
-    body { font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial, sans-serif; margin: 0; background:#fff; color:#111; }
-    .wrap { max-width: 760px; margin: 0 auto; padding: 48px 20px; }
-    h1 { font-size: 32px; margin-bottom: 16px; }
-    p { line-height: 1.6; margin: 12px 0; }
-    ul { margin: 12px 0 16px 20px; }
-    pre { background: #f8f8f8; border: 1px solid #e5e7eb; border-radius: 8px; padding: 12px; font-size: 13px; overflow-x: auto; }
-    .note { background: #fafafa; border-left: 4px solid #ddd; padding: 12px; margin: 20px 0; }
-  </style>
-</head>
-<body>
-  <div class="wrap">
-    <h1>Excel CSV opens in one column — wrong delimiter</h1>
-
-    <p>
-      If your CSV opens entirely in a single column in Excel, it usually means
-      Excel guessed the wrong delimiter.
-    </p>
-
-    <p>This often happens when:</p>
-    <ul>
-      <li>The file uses semicolons instead of commas</li>
-      <li>The system locale expects decimal commas</li>
-      <li>The CSV was exported from European software</li>
-    </ul>
-
-    <p><b>Example CSV</b></p>
-    <pre>
-id;amount;description
-1;1.234,56;Invoice
-2;12,34;Refund
-    </pre>
-
-    <p><b>After fixing the delimiter</b></p>
-    <pre>
-id,amount,description
-1,1234.56,Invoice
-2,12.34,Refund
-    </pre>
-
-    <div class="note">
-      The fix is to detect the correct delimiter and normalize numeric formats
-      so Excel and other tools parse the file correctly.
-    </div>
-
-    <p>
-      To fix the file automatically, upload it here:
-      <a href="/">CleanCSV</a>
-    </p>
-  </div>
-</body>
-</html>
-"""
-PROBLEM_EXPECTED_FIELDS_SAW_FIELDS_HTML = """
-<!doctype html>
-<html>
-<head>
-  <meta charset="utf-8" />
-  <title>Fix CSV error: Expected N fields in line X, saw Y</title>
-  <meta name="description" content="Why the CSV error “Expected N fields in line X, saw Y” occurs in pandas and other tools, and how to repair the file so it imports correctly." />
-  <link rel="canonical" href="{{ BASE_URL }}/problems/expected-fields-saw-fields" />
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <style>
-    body {
-      font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial, sans-serif;
-      margin: 0;
-      background: #fff;
-      color: #111;
-    }
-    .wrap {
-      max-width: 760px;
-      margin: 0 auto;
-      padding: 48px 20px;
-    }
-    h1 {
-      font-size: 32px;
-      margin-bottom: 16px;
-    }
-    p {
-      line-height: 1.6;
-      margin: 12px 0;
-    }
-    ul {
-      margin: 12px 0 16px 20px;
-    }
-    pre {
-      background: #f8f8f8;
-      border: 1px solid #e5e7eb;
-      border-radius: 8px;
-      padding: 12px;
-      font-size: 13px;
-      overflow-x: auto;
-    }
-    .note {
-      background: #fafafa;
-      border-left: 4px solid #ddd;
-      padding: 12px;
-      margin: 20px 0;
-    }
-    .muted {
-      color: #666;
-      font-size: 14px;
-    }
-  </style>
-</head>
-<body>
-  <div class="wrap">
-    <h1>Fix CSV error: “Expected N fields in line X, saw Y”</h1>
-
-    <p>
-      This error means that not all rows in your CSV file have the same number of columns.
-      Strict parsers (like pandas, Excel, Power BI, and databases) stop importing when this happens.
-    </p>
-
-    <p>Common causes include:</p>
-    <ul>
-      <li>Extra delimiters inside text fields</li>
-      <li>Newlines inside quoted values</li>
-      <li>Wrong delimiter guessed (comma vs semicolon vs tab)</li>
-      <li>Report-style exports with header text above the real CSV header</li>
-    </ul>
-
-    <p class="muted">You may see an error like:</p>
-    <pre>Error tokenizing data. C error: Expected 13 fields in line 64, saw 15</pre>
-
-    <p><b>Example of a CSV that triggers this error</b></p>
-    <pre>
-id,name,amount
-1,"ACME, Inc",100
-2,Widget,200,EXTRA
-    </pre>
-
-    <p><b>After repairing the file</b></p>
-    <pre>
-id,name,amount
-1,ACME, Inc,100
-2,Widget,200
-    </pre>
-
-    <div class="note">
-      The fix is to normalize row structure so every row matches the header,
-      stitch multiline quoted records back into a single row,
-      and ensure the correct delimiter is used.
-    </div>
-
-    <p>
-      To fix the file automatically, upload it here:
-      <a href="/">CleanCSV</a>
-    </p>
-  </div>
-</body>
-</html>
-"""
-
-PROBLEM_EXPECTED_FIELDS_SAW_FIELDS_HTML = """
-<!doctype html>
-<html>
-<head>
-  <meta charset="utf-8" />
-  <title>Fix CSV error: Expected N fields in line X, saw Y (pandas / import)</title>
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <style>
-    body { font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial, sans-serif; margin: 0; background:#fff; color:#111; }
-    .wrap { max-width: 760px; margin: 0 auto; padding: 48px 20px; }
-    h1 { font-size: 32px; margin-bottom: 16px; }
-    p { line-height: 1.6; margin: 12px 0; }
-    ul { margin: 12px 0 16px 20px; }
-    pre { background: #f8f8f8; border: 1px solid #e5e7eb; border-radius: 8px; padding: 12px; font-size: 13px; overflow-x: auto; }
-    code { background:#f1f5f9; padding: 2px 6px; border-radius: 6px; }
-    .note { background: #fafafa; border-left: 4px solid #ddd; padding: 12px; margin: 20px 0; }
-  </style>
-</head>
-<body>
-  <div class="wrap">
-    <h1>Fix CSV error: “Expected N fields in line X, saw Y”</h1>
-
-    <p>
-      This error means your CSV rows don’t all have the same number of columns.
-      It commonly appears when importing with pandas (<code>read_csv</code>), Excel, Power BI,
-      databases, or other strict parsers.
-    </p>
-
-    <p>Typical causes:</p>
-    <ul>
-      <li>Extra delimiters in some rows (e.g., commas inside unquoted text)</li>
-      <li>Newlines inside quoted fields (a single record spans multiple lines)</li>
-      <li>Wrong delimiter guessed (comma vs semicolon vs tab)</li>
-      <li>Report-style exports with preamble lines above the real header</li>
-    </ul>
-    <p><b>Common pandas error message</b></p>
-    <pre>Error tokenizing data. C error: Expected 13 fields in line 64, saw 15</pre>
-    
-    <p><b>Example of a file that triggers the error</b></p>
-    <pre>
-id,name,amount
-1,"ACME, Inc",100
-2,Widget,200,EXTRA
-    </pre>
-
-    <p><b>After repair</b></p>
-    <pre>
-id,name,amount
-1,ACME, Inc,100
-2,Widget,200
-    </pre>
-
-    <div class="note">
-      The fix is to normalize row structure (pad/truncate to the header width),
-      stitch multiline quoted records back into single rows, and ensure the correct delimiter is used.
-    </div>
-
-    <p>
-      To fix the file automatically, upload it here:
-      <a href="/">CleanCSV</a>
-    </p>
-  </div>
-</body>
-</html>
-"""
-PROBLEM_CSV_ENCODING_HTML = """
-<!doctype html>
-<html>
-<head>
-  <meta charset="utf-8" />
-  <title>Fix CSV encoding issues (�, UTF-8 vs Windows-1252)</title>
-  <meta name="description" content="Why CSV files show weird characters like � and how to fix encoding issues by converting Windows-1252 and other encodings to UTF-8." />
-  <link rel="canonical" href="{{ BASE_URL }}/problems/csv-encoding-utf8-windows-1252" />
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <style>
-    body { font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial, sans-serif; margin: 0; background:#fff; color:#111; }
-    .wrap { max-width: 760px; margin: 0 auto; padding: 48px 20px; }
-    h1 { font-size: 32px; margin-bottom: 16px; }
-    p { line-height: 1.6; margin: 12px 0; }
-    ul { margin: 12px 0 16px 20px; }
-    pre { background: #f8f8f8; border: 1px solid #e5e7eb; border-radius: 8px; padding: 12px; font-size: 13px; overflow-x: auto; }
-    code { background:#f1f5f9; padding: 2px 6px; border-radius: 6px; }
-    .note { background: #fafafa; border-left: 4px solid #ddd; padding: 12px; margin: 20px 0; }
-    .muted { color: #666; font-size: 14px; }
-  </style>
-</head>
-<body>
-  <div class="wrap">
-    <h1>Fix CSV encoding issues (�, UTF-8 vs Windows-1252)</h1>
-
-    <p>
-      If your CSV imports with weird characters (like <code>�</code>), broken quotes, or garbled symbols,
-      the file is likely using a different text encoding than your tool expects.
-    </p>
-
-    <p>Common symptoms:</p>
-    <ul>
-      <li>Curly quotes turn into <code>�</code> or random symbols</li>
-      <li>Currency symbols like <code>€</code> or <code>£</code> don’t display correctly</li>
-      <li>Accented characters (e.g., <code>café</code>) appear corrupted</li>
-    </ul>
-
-    <p class="muted">You might see characters like this:</p>
-    <pre>Alice,â€œsmart quotesâ€ â€” cafÃ©</pre>
-
-    <p><b>After decoding properly</b></p>
-    <pre>Alice,“smart quotes” — café</pre>
-
-    <div class="note">
-      The fix is to detect the correct encoding (often <b>Windows-1252</b> / <b>cp1252</b> for exports from older systems),
-      decode the file safely, and re-save as UTF-8 for maximum compatibility.
-    </div>
-
-    <p>
-      To fix the file automatically, upload it here:
-      <a href="/">CleanCSV</a>
-    </p>
-  </div>
-</body>
-</html>
-"""
-
-PROBLEM_POWERBI_DECIMAL_COMMA_HTML = """
-<!doctype html>
-<html>
-<head>
-  <meta charset="utf-8" />
-  <title>Power BI CSV decimal comma issue — fix import parsing</title>
-  <meta name="description" content="Fix Power BI CSV import problems caused by decimal commas and European number formats by normalizing delimiters and numeric values." />
-  <link rel="canonical" href="{{ BASE_URL }}/problems/powerbi-decimal-comma-csv" />
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <style>
-    body { font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial, sans-serif; margin: 0; background:#fff; color:#111; }
-    .wrap { max-width: 760px; margin: 0 auto; padding: 48px 20px; }
-    h1 { font-size: 32px; margin-bottom: 16px; }
-    p { line-height: 1.6; margin: 12px 0; }
-    ul { margin: 12px 0 16px 20px; }
-    pre { background: #f8f8f8; border: 1px solid #e5e7eb; border-radius: 8px; padding: 12px; font-size: 13px; overflow-x: auto; }
-    .note { background: #fafafa; border-left: 4px solid #ddd; padding: 12px; margin: 20px 0; }
-  </style>
-</head>
-<body>
-  <div class="wrap">
-    <h1>Power BI CSV decimal comma issue (EU number formats)</h1>
-
-    <p>
-      If Power BI imports your CSV but numbers come in as text, split incorrectly, or show errors,
-      the file may be using <b>European number formatting</b>:
-      decimal commas (e.g., <code>12,34</code>) and often semicolon delimiters (e.g., <code>;</code>).
-    </p>
-
-    <p>Common symptoms:</p>
-    <ul>
-      <li>Numeric columns import as text</li>
-      <li>Values like <code>1.234,56</code> don’t parse as numbers</li>
-      <li>Columns shift because Power BI guessed the wrong delimiter</li>
-    </ul>
-
-    <p><b>Example CSV (EU format)</b></p>
-    <pre>
-id;amount;description
-1;1.234,56;Invoice
-2;12,34;Refund
-3;(5,00);Chargeback
-    </pre>
-
-    <p><b>After normalization (Power BI-friendly)</b></p>
-    <pre>
-id,amount,description
-1,1234.56,Invoice
-2,12.34,Refund
-3,-5.00,Chargeback
-    </pre>
-
-    <div class="note">
-      The fix is to detect the correct delimiter and normalize numeric formats
-      (decimal commas, thousands separators, parentheses negatives) so Power BI can type the column as numeric.
-    </div>
-
-    <p>
-      To fix the file automatically, upload it here:
-      <a href="/">CleanCSV</a>
-    </p>
-  </div>
-</body>
-</html>
-"""
-PROBLEMS_INDEX_HTML = """
-<!doctype html>
-<html>
-<head>
-  <meta charset="utf-8" />
-  <title>CSV import problems CleanCSV fixes</title>
-  <meta name="description" content="A list of common CSV import errors and explanations of how to fix delimiter, encoding, and malformed record issues." />
-  <link rel="canonical" href="{{ BASE_URL }}/problems" />
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <style>
-    body {
-      font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial, sans-serif;
-      margin: 0;
-      background: #fff;
-      color: #111;
-    }
-    .wrap {
-      max-width: 760px;
-      margin: 0 auto;
-      padding: 48px 20px;
-    }
-    h1 {
-      font-size: 32px;
-      margin-bottom: 12px;
-    }
-    p {
-      line-height: 1.6;
-      margin: 12px 0;
-    }
-    ul {
-      margin: 20px 0;
-      padding-left: 18px;
-    }
-    li {
-      margin: 12px 0;
-    }
-    a {
-      color: #111;
-      text-decoration: underline;
-    }
-    .muted {
-      color: #666;
-      font-size: 14px;
-    }
-  </style>
-</head>
-<body>
-  <div class="wrap">
-    <h1>CSV import problems</h1>
-
-    <p>
-      These pages explain common CSV import errors and how to fix them.
-      Each page describes the issue and provides a way to repair the file automatically.
-    </p>
-
-    <ul>
-      <li>
-        <a href="/problems/expected-fields-error">
-          CSV import error: “Expected 3 fields, saw 5”
-        </a>
-      </li>
-      <li>
-        <a href="/problems/expected-fields-saw-fields">
-          pandas error: “Expected N fields in line X, saw Y”
-        </a>
-      </li>
-      <li>
-        <a href="/problems/excel-one-column-csv">
-          Excel CSV opens in one column (wrong delimiter)
-        </a>
-      </li>
-      <li>
-        <a href="/problems/powerbi-decimal-comma-csv">
-          Power BI CSV decimal comma issue (EU number formats)
-        </a>
-      </li>
-      <li>
-        <a href="/problems/csv-encoding-utf8-windows-1252">
-          CSV encoding issues (�, UTF-8 vs Windows-1252)
-        </a>
-      </li>
-    </ul>
-
-    <p class="muted">
-      To fix a file, upload it here:
-      <a href="/">CleanCSV</a>
-    </p>
-  </div>
-</body>
-</html>
-"""
-RESULT_HTML = """
-<!doctype html>
-<html>
-<head>
-  <meta charset="utf-8" />
-  <title>CleanCSV — Results</title>
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-
-  <style>
-    body {
-      font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial, sans-serif;
-      margin: 0;
-      background: #fff;
-      color: #111;
-    }
-
-    .wrap {
-      max-width: 1120px;
-      margin: 0 auto;
-      padding: 32px 20px 28px;
-    }
-
-    .card {
-      border: 1px solid #e5e7eb;
-      border-radius: 14px;
-      padding: 18px;
-      background: #fff;
-      margin-top: 16px;
-    }
-
-    .btn {
-      display: inline-block;
-      padding: 10px 14px;
-      border-radius: 4px;
-      border: 1px solid #374151;
-      background: #374151;
-      color: #fff;
-      text-decoration: none;
-      font-weight: 500;
-    }
-
-    .muted {
-      color: #666;
-      font-size: 14px;
-      line-height: 1.45;
-    }
-
-    .pill {
-      display: inline-block;
-      padding: 4px 10px;
-      border: 1px solid #e5e7eb;
-      border-radius: 999px;
-      font-size: 12px;
-      color: #444;
-      background: #fafafa;
-      margin-right: 8px;
-    }
-
-    .warn {
-      color: #8a6d3b;
-    }
-
-    .subhead {
-      font-weight: 700;
-      margin: 14px 0 6px;
-    }
+# Payment copy only depends on PAYMENTS_ENABLED, so it is settled once here
+PAY_META = {
+    "index_note": "Download requires a one-time fee." if PAYMENTS_ENABLED else "Payments disabled. Downloads are free.",
+    "result_note": "$5 one-time download" if PAYMENTS_ENABLED else "Payments disabled. Downloads are free.",
+    "unpaid_label": "Pay $5 & download" if PAYMENTS_ENABLED else "Download cleaned file",
+    "paid_label": "Download cleaned file",
+}
 
-    .table-wrap {
-      overflow-x: auto;
-      width: 100%;
-      border: 1px solid #e5e7eb;
-      border-radius: 10px;
-      padding: 8px;
-      background: #fff;
-    }
+# Pages live in templates/; the problem pages build canonical links from BASE_URL
+app.jinja_env.globals["BASE_URL"] = BASE_URL
+app.jinja_env.globals["pay"] = PAY_META
 
-    .table-wrap table {
-      border-collapse: collapse;
-      width: max-content;
-      min-width: 100%;
-    }
+# Werkzeug stops reading (413) once a body passes this, even without a Content-Length
+app.config["MAX_CONTENT_LENGTH"] = MAX_BYTES
 
-    .table-wrap th,
-    .table-wrap td {
-      border-bottom: 1px solid #eee;
-      padding: 8px;
-      text-align: left;
-      font-size: 13px;
-      white-space: nowrap;
-    }
-
-    /* Change log styling */
-    .change-log {
-      margin: 6px 0 0 18px;
-    }
-
-    .change-log li {
-      margin: 6px 0;
-    }
-
-    .change-fix {
-      color: #047857;
-      font-weight: 500;
-    }
+# ip -> (tokens left, time of last refill)
+_upload_hits: dict[str, tuple[float, float]] = {}
 
-    .change-ok {
-      color: #374151;
-    }
-
-    footer {
-      border-top: 1px solid #f0f0f0;
-      margin-top: 28px;
-      padding-top: 18px;
-      color: #666;
-      font-size: 13px;
-      display: flex;
-      flex-wrap: wrap;
-      gap: 10px 18px;
-      justify-content: space-between;
-    }
-
-    .footer-left {
-      display: flex;
-      flex-wrap: wrap;
-      gap: 10px 18px;
-    }
-  </style>
-</head>
-
-<body>
-  <div class="wrap">
-    <h1 style="margin:0 0 6px;">Results</h1>
-
-    <p class="muted" style="margin:0 0 10px;">
-      <span class="pill">Job: {{ job_id }}</span>
-      <span class="pill">Paid: {{ "yes" if paid else "no" }}</span>
-      {% if import_warning %}<span class="pill warn">Import repaired</span>{% endif %}
-      {% if near_dupes_mode %}<span class="pill">Near-dupes: {{ near_dupes_mode }}</span>{% endif %}
-      {% if detected_delimiter %}<span class="pill">Delimiter: {{ detected_delimiter_label }}</span>{% endif %}
-    </p>
-
-    <p class="muted" style="margin:0 0 12px;">
-      <span class="pill">Encoding: {{ encoding_label }}</span>
-      <span class="pill">Numbers: {{ numbers_label }}</span>
-      <span class="pill">Header: {{ header_label }}</span>
-    </p>
-
-    <div class="card">
-      <p style="margin:0;">
-        <strong>Records:</strong> {{ rows }}
-        <span class="muted">(header excluded)</span>
-        &nbsp; <strong>Columns:</strong> {{ cols }}
-      </p>
-    </div>
-
-      <p class="muted" style="margin-top:10px;">
-        Summary of validation and repair steps:
-      </p>
-
-<!-- Repairs applied -->
-{% if repairs_applied %}
-  <p class="subhead">Repairs applied</p>
-  <ul class="change-log">
-    {% for item in repairs_applied %}
-      <li class="change-fix">{{ item }}</li>
-    {% endfor %}
-  </ul>
-{% endif %}
-
-<!-- Checks passed -->
-{% if checks_passed %}
-  <p class="subhead" style="margin-top:16px;">Checks passed</p>
-  <ul class="change-log">
-    {% for item in checks_passed %}
-      <li class="change-ok">{{ item }}</li>
-    {% endfor %}
-  </ul>
-{% endif %}
-
-      <div style="margin-top:16px;">
-        <a class="btn" href="/download/{{ job_id }}">
-          {% if paid or not payments_enabled %}
-            Download cleaned file
-          {% else %}
-            Pay $5 & download
-          {% endif %}
-        </a>
-
-        <p class="muted" style="margin-top:8px;">
-          This file reflects the changes listed above.
-        </p>
-      </div>
-
-      <p class="muted" style="margin-top:12px;">
-        {% if payments_enabled %}
-          $5 one-time download
-        {% else %}
-          Payments disabled. Downloads are free.
-        {% endif %}
-      </p>
-    </div>
-
-    {% if near_dupe_examples %}
-      <div class="card">
-        <p class="subhead">Near-duplicate examples</p>
-        <p class="muted" style="margin-top:0;">
-          Each example shows two rows. “Kept” is the first occurrence;
-          the other is {{ "what would be removed" if near_dupes_mode == "preview" else "what was removed" }}.
-        </p>
-
-        {% for ex in near_dupe_examples %}
-          <div style="margin-top:14px;">
-            <div class="table-wrap">{{ ex|safe }}</div>
-          </div>
-        {% endfor %}
-      </div>
-    {% endif %}
-
-    <div class="card">
-      <p class="subhead">Preview: first 10 rows</p>
-      <div class="table-wrap">{{ preview_first|safe }}</div>
-    </div>
-
-    <div class="card">
-      <p class="subhead">Preview: last 10 rows</p>
-      <div class="table-wrap">{{ preview_last|safe }}</div>
-    </div>
-
-    {% if preview_repaired %}
-      <div class="card">
-        <p class="subhead">Preview: repaired rows (up to 10)</p>
-        <p class="muted" style="margin-top:0;">
-          These rows had the wrong number of columns and were repaired.
-        </p>
-        <div class="table-wrap">{{ preview_repaired|safe }}</div>
-      </div>
-    {% endif %}
-
-    <footer>
-      <div class="footer-left">
-        <span>Files are not stored.</span>
-        <span>Support: {{ support_email }}</span>
-      </div>
-      <div>
-        <span class="pill">Secure checkout via Stripe</span>
-      </div>
-    </footer>
-  </div>
-</body>
-</html>
-"""
-
-SUCCESS_HTML = """
-<!doctype html>
-<html>
-<head>
-  <meta charset="utf-8" />
-  <title>CleanCSV — Payment received</title>
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <style>
-    body { font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial, sans-serif; margin: 0; background:#fff; color:#111; }
-    .wrap { max-width: 920px; margin: 0 auto; padding: 40px 20px 28px; }
-    .btn { display:inline-block; padding: 10px 14px; border-radius: 10px; border: 1px solid #111; background: #111; color: #fff; text-decoration:none; font-weight:600; }
-    .muted { color: #666; font-size: 14px; line-height:1.45; }
-    footer { border-top: 1px solid #f0f0f0; margin-top: 28px; padding-top: 18px; color: #666; font-size: 13px; }
-  </style>
-</head>
-<body>
-  <div class="wrap">
-    <h1 style="margin:0 0 8px;">Payment received</h1>
-    <p class="muted" style="margin-top:0;">You're good to go.</p>
-    <p><a class="btn" href="/download/{{ job_id }}">Download cleaned file</a></p>
-    <p class="muted">Need help? Email {{ support_email }} and include Job ID: {{ job_id }}</p>
-    <p class="muted"><a href="/result/{{ job_id }}">Back to results</a></p>
-    <footer>Files are not stored • Support: {{ support_email }}</footer>
-  </div>
-</body>
-</html>
-"""
-
-CANCEL_HTML = """
-<!doctype html>
-<html>
-<head><meta charset="utf-8" /><title>CleanCSV — Payment canceled</title></head>
-<body style="font-family:system-ui,sans-serif;margin:40px;">
-  <h1>Payment canceled</h1>
-  <p><a href="/">Back to upload</a></p>
-</body>
-</html>
-"""
+# ============================
+# Problem pages
+# ============================
+# Rendered by templates/problems/problem.html. Fields holding inline markup
+# are wrapped in Markup; example samples are plain text.
+PROBLEMS: dict[str, dict[str, Any]] = {
+    "expected-fields-error": {
+        "title": "Fix CSV import error: “Expected 3 fields, saw 5”",
+        "description": "Explanation of the CSV import error “Expected 3 fields, saw 5” and how to fix it by repairing inconsistent rows and malformed records.",
+        "link_text": "CSV import error: “Expected 3 fields, saw 5”",
+        "h1": "Fix CSV import error: “Expected 3 fields, saw 5”",
+        "intro": "This error occurs when rows in a CSV file contain more columns than the header row. Many tools stop importing when this happens.",
+        "causes_label": "Common causes include:",
+        "causes": [
+            "Extra delimiters inside text fields",
+            "Line breaks inside quoted values",
+            "Inconsistent exports from reporting tools",
+        ],
+        "examples": [
+            ("Example of a broken CSV", 'id,name,amount\n1,"ACME, Inc",100\n2,Widget,200,EXTRA'),
+            ("After repairing the file", "id,name,amount\n1,ACME, Inc,100\n2,Widget,200"),
+        ],
+        "note": "The fix is to repair row structure so every row matches the header and malformed records are stitched back together correctly.",
+    },
+    "expected-fields-saw-fields": {
+        "title": "Fix CSV error: Expected N fields in line X, saw Y (pandas / import)",
+        "description": "Why the CSV error “Expected N fields in line X, saw Y” occurs in pandas and other tools, and how to repair the file so it imports correctly.",
+        "link_text": "pandas error: “Expected N fields in line X, saw Y”",
+        "h1": "Fix CSV error: “Expected N fields in line X, saw Y”",
+        "intro": Markup(
+            "This error means your CSV rows don’t all have the same number of columns. "
+            "It commonly appears when importing with pandas (<code>read_csv</code>), Excel, Power BI, "
+            "databases, or other strict parsers."
+        ),
+        "causes_label": "Typical causes:",
+        "causes": [
+            "Extra delimiters in some rows (e.g., commas inside unquoted text)",
+            "Newlines inside quoted fields (a single record spans multiple lines)",
+            "Wrong delimiter guessed (comma vs semicolon vs tab)",
+            "Report-style exports with preamble lines above the real header",
+        ],
+        "examples": [
+            ("Common pandas error message", "Error tokenizing data. C error: Expected 13 fields in line 64, saw 15"),
+            ("Example of a file that triggers the error", 'id,name,amount\n1,"ACME, Inc",100\n2,Widget,200,EXTRA'),
+            ("After repair", "id,name,amount\n1,ACME, Inc,100\n2,Widget,200"),
+        ],
+        "note": (
+            "The fix is to normalize row structure (pad/truncate to the header width), "
+            "stitch multiline quoted records back into single rows, and ensure the correct delimiter is used."
+        ),
+    },
+    "excel-one-column-csv": {
+        "title": "Excel CSV opens in one column — wrong delimiter",
+        "description": "Why Excel opens some CSV files in a single column and how to fix delimiter issues so data imports into separate columns correctly.",
+        "link_text": "Excel CSV opens in one column (wrong delimiter)",
+        "h1": "Excel CSV opens in one column — wrong delimiter",
+        "intro": "If your CSV opens entirely in a single column in Excel, it usually means Excel guessed the wrong delimiter.",
+        "causes_label": "This often happens when:",
+        "causes": [
+            "The file uses semicolons instead of commas",
+            "The system locale expects decimal commas",
+            "The CSV was exported from European software",
+        ],
+        "examples": [
+            ("Example CSV", "id;amount;description\n1;1.234,56;Invoice\n2;12,34;Refund"),
+            ("After fixing the delimiter", "id,amount,description\n1,1234.56,Invoice\n2,12.34,Refund"),
+        ],
+        "note": "The fix is to detect the correct delimiter and normalize numeric formats so Excel and other tools parse the file correctly.",
+    },
+    "powerbi-decimal-comma-csv": {
+        "title": "Power BI CSV decimal comma issue — fix import parsing",
+        "description": "Fix Power BI CSV import problems caused by decimal commas and European number formats by normalizing delimiters and numeric values.",
+        "link_text": "Power BI CSV decimal comma issue (EU number formats)",
+        "h1": "Power BI CSV decimal comma issue (EU number formats)",
+        "intro": Markup(
+            "If Power BI imports your CSV but numbers come in as text, split incorrectly, or show errors, "
+            "the file may be using <b>European number formatting</b>: "
+            "decimal commas (e.g., <code>12,34</code>) and often semicolon delimiters (e.g., <code>;</code>)."
+        ),
+        "causes_label": "Common symptoms:",
+        "causes": [
+            "Numeric columns import as text",
+            Markup("Values like <code>1.234,56</code> don’t parse as numbers"),
+            "Columns shift because Power BI guessed the wrong delimiter",
+        ],
+        "examples": [
+            ("Example CSV (EU format)", "id;amount;description\n1;1.234,56;Invoice\n2;12,34;Refund\n3;(5,00);Chargeback"),
+            ("After normalization (Power BI-friendly)", "id,amount,description\n1,1234.56,Invoice\n2,12.34,Refund\n3,-5.00,Chargeback"),
+        ],
+        "note": (
+            "The fix is to detect the correct delimiter and normalize numeric formats "
+            "(decimal commas, thousands separators, parentheses negatives) so Power BI can type the column as numeric."
+        ),
+    },
+    "csv-encoding-utf8-windows-1252": {
+        "title": "Fix CSV encoding issues (�, UTF-8 vs Windows-1252)",
+        "description": "Why CSV files show weird characters like � and how to fix encoding issues by converting Windows-1252 and other encodings to UTF-8.",
+        "link_text": "CSV encoding issues (�, UTF-8 vs Windows-1252)",
+        "h1": "Fix CSV encoding issues (�, UTF-8 vs Windows-1252)",
+        "intro": Markup(
+            "If your CSV imports with weird characters (like <code>�</code>), broken quotes, or garbled symbols, "
+            "the file is likely using a different text encoding than your tool expects."
+        ),
+        "causes_label": "Common symptoms:",
+        "causes": [
+            Markup("Curly quotes turn into <code>�</code> or random symbols"),
+            Markup("Currency symbols like <code>€</code> or <code>£</code> don’t display correctly"),
+            Markup("Accented characters (e.g., <code>café</code>) appear corrupted"),
+        ],
+        "examples": [
+            ("You might see characters like this", "Alice,â€œsmart quotesâ€ â€” cafÃ©"),
+            ("After decoding properly", "Alice,“smart quotes” — café"),
+        ],
+        "note": Markup(
+            "The fix is to detect the correct encoding (often <b>Windows-1252</b> / <b>cp1252</b> for exports from older systems), "
+            "decode the file safely, and re-save as UTF-8 for maximum compatibility."
+        ),
+    },
+}
 
 # ============================
 # Rate limiting + file checks
 # ============================
-def rate_limit_check(ip: str) -> bool:
+def rate_limit_check(ip: str) -> int:
+    """
+    Token bucket: bursts of up to RATE_MAX_UPLOADS, refilled at
+    RATE_MAX_UPLOADS per RATE_WINDOW_SECONDS. Returns 0 when the upload
+    may go ahead, else the whole seconds until the next slot frees up.
+    """
     now = time.time()
-    q = _upload_hits[ip]
-    while q and (now - q[0]) > RATE_WINDOW_SECONDS:
-        q.popleft()
-    if len(q) >= RATE_MAX_UPLOADS:
-        return False
-    q.append(now)
-    return True
+    rate = RATE_MAX_UPLOADS / RATE_WINDOW_SECONDS  # slots per second
+    tokens, last = _upload_hits.get(ip, (RATE_MAX_UPLOADS, now))
+    tokens = min(RATE_MAX_UPLOADS, tokens + (now - last) * rate)
+    if tokens < 1:
+        _upload_hits[ip] = (tokens, now)
+        return max(1, math.ceil((1 - tokens) / rate))
+    _upload_hits[ip] = (tokens - 1, now)
+    return 0
 
 
 def looks_like_text_file(path: Path, sample_bytes: int = 4096) -> bool:
     try:
-        b = path.read_bytes()[:sample_bytes]
+        with path.open("rb") as f:
+            b = f.read(sample_bytes)
     except Exception:
         return False
     return b"\x00" not in b
@@ -1192,15 +287,68 @@ def looks_like_csv_name(filename: str) -> bool:
 # ============================
 # Storage helpers
 # ============================
+_cleanup_lock = threading.Lock()
+
+
 def cleanup_old_files() -> None:
-    cutoff = datetime.now(timezone.utc) - timedelta(minutes=RETENTION_MINUTES)
-    for p in WORK_DIR.glob("*"):
+    if not _cleanup_lock.acquire(blocking=False):
+        return  # a sweep is already running
+    try:
+        cutoff = time.time() - RETENTION_MINUTES * 60
+        with os.scandir(WORK_DIR) as it:
+            for entry in it:
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                except OSError:
+                    pass
+    finally:
+        _cleanup_lock.release()
+
+
+def _cleanup_loop() -> None:
+    while True:
         try:
-            mtime = datetime.fromtimestamp(p.stat().st_mtime, tz=timezone.utc)
-            if mtime < cutoff:
-                p.unlink(missing_ok=True)
+            cleanup_old_files()
         except Exception:
-            pass
+            logger.exception("cleanup_old_files failed")
+        time.sleep(CLEANUP_INTERVAL_SECONDS)
+
+
+# Expired jobs are swept in the background rather than on every request
+threading.Thread(target=_cleanup_loop, name="cleancsv-cleanup", daemon=True).start()
+
+
+def send_job_file(p: Path, download_name: str):
+    """
+    Sends a file from WORK_DIR as an attachment. send_file already answers
+    conditional/range requests and uses the server's wsgi.file_wrapper
+    (sendfile) when there is one; with X_ACCEL_PREFIX nginx serves it instead.
+    """
+    # No exists() check first: send_file stats the file anyway, so a missing
+    # (e.g. already swept) file is a 404 from that one stat
+    try:
+        if not X_ACCEL_PREFIX:
+            return send_file(p, as_attachment=True, download_name=download_name)
+
+        resp = werkzeug_send_file(
+            p,
+            request.environ,
+            as_attachment=True,
+            download_name=download_name,
+            use_x_sendfile=True,
+            response_class=app.response_class,
+            # nginx redoes ranges and validation (with its own ETags) when it
+            # follows the redirect; answering them here too would disagree
+            conditional=False,
+            etag=False,
+        )
+    except FileNotFoundError:
+        abort(404)
+    del resp.headers["X-Sendfile"]
+    del resp.headers["Content-Length"]  # nginx supplies the body and its length
+    resp.headers["X-Accel-Redirect"] = X_ACCEL_PREFIX.rstrip("/") + "/" + p.name
+    return resp
 
 
 def bytes_too_large(req) -> bool:
@@ -1216,8 +364,32 @@ def raw_path(job_id: str) -> Path:
     return WORK_DIR / f"{job_id}.raw"
 
 
-def norm_path(job_id: str) -> Path:
-    return WORK_DIR / f"{job_id}.normalized"
+class UploadRequest(Request):
+    """
+    Lets a handler name the file the multipart parser writes the first
+    uploaded file into (set upload_path before touching request.files), so
+    the upload lands at raw_path() directly instead of in a spooled temp
+    file that then has to be copied there.
+    """
+
+    upload_path: Path | None = None
+    upload_file = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.upload_path is None or self.upload_file is not None:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        self.upload_file = self.upload_path.open("w+b")
+        return self.upload_file
+
+    def discard_upload(self) -> None:
+        """Closes and deletes the file the parser wrote into, if there is one."""
+        if self.upload_file is not None:
+            self.upload_file.close()
+        if self.upload_path is not None:
+            self.upload_path.unlink(missing_ok=True)
+
+
+app.request_class = UploadRequest
 
 
 def manifest_path(job_id: str) -> Path:
@@ -1243,6 +415,8 @@ def write_manifest(job_id: str, data: dict[str, Any]) -> None:
         "paid_at": None,
         "stripe_session_id": None,
         "stripe_event_id": None,
+        "stripe_session_url": None,
+        "stripe_session_expires_at": None,
         "rows": None,
         "cols": None,
         "changelog": [],
@@ -1252,20 +426,68 @@ def write_manifest(job_id: str, data: dict[str, Any]) -> None:
         "ignored_cols": [],
         "near_dupes_count": 0,
         "near_dupe_examples_rows": [],
+        "near_dupe_examples_html": [],
         "detected_delimiter": ",",
+        "numbers_normalized": False,
+        "header_detected": False,
+        "preview_first_html": "",
+        "preview_last_html": "",
+        "preview_repaired_html": "",
         "out_file": out_path(job_id).name,
         "original_file": raw_path(job_id).name,
         "original_filename": "original.csv",
     }
     base.update(data)
-    manifest_path(job_id).write_text(json.dumps(base, indent=2), encoding="utf-8")
+    save_manifest(job_id, base)
+
+
+def save_manifest(job_id: str, m: dict[str, Any]) -> None:
+    """Write via a temp file + rename so readers never see a half-written manifest."""
+    # Compact: manifests carry rendered preview HTML and nobody reads them by hand
+    if orjson is not None:
+        payload = orjson.dumps(m)
+    else:
+        payload = json.dumps(m, separators=(",", ":")).encode("utf-8")
+    p = manifest_path(job_id)
+    tmp = p.with_name(f"{p.name}.{secrets.token_hex(8)}.tmp")
+    tmp.write_bytes(payload)
+    os.replace(tmp, p)
+
+
+# job_id -> ((inode, mtime_ns, size), manifest). Keyed on the file's stat so a
+# write from any worker process (save_manifest always renames in a new inode)
+# invalidates it; a stat is much cheaper than read + parse.
+_MANIFEST_CACHE_MAX = 1024
+_manifest_cache: OrderedDict[str, tuple[tuple[int, int, int], dict[str, Any]]] = OrderedDict()
+_manifest_cache_lock = threading.Lock()
 
 
 def read_manifest(job_id: str) -> dict[str, Any]:
     p = manifest_path(job_id)
-    if not p.exists():
+    try:
+        st = p.stat()
+    except FileNotFoundError:
+        return {}
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    with _manifest_cache_lock:
+        hit = _manifest_cache.get(job_id)
+        if hit is not None and hit[0] == key:
+            _manifest_cache.move_to_end(job_id)
+            return dict(hit[1])  # callers mutate and re-save the dict they get
+
+    try:
+        data = p.read_bytes()
+    except FileNotFoundError:
         return {}
-    return json.loads(p.read_text(encoding="utf-8"))
+    m = orjson.loads(data) if orjson is not None else json.loads(data)
+
+    with _manifest_cache_lock:
+        _manifest_cache[job_id] = (key, m)
+        _manifest_cache.move_to_end(job_id)
+        if len(_manifest_cache) > _MANIFEST_CACHE_MAX:
+            _manifest_cache.popitem(last=False)
+    return dict(m)
 
 
 def mark_paid(job_id: str, session_id: str | None = None, event_id: str | None = None) -> None:
@@ -1278,75 +500,57 @@ def mark_paid(job_id: str, session_id: str | None = None, event_id: str | None =
         m["stripe_session_id"] = session_id
     if event_id:
         m["stripe_event_id"] = event_id
-    manifest_path(job_id).write_text(json.dumps(m, indent=2), encoding="utf-8")
+    save_manifest(job_id, m)
 
 
 # ============================
 # Quote stitching + encoding normalization
 # ============================
-def stitch_csv_records(text: str) -> tuple[str, dict]:
-    lines = text.split("\n")
-    physical = len(lines)
-
-    logical_lines: list[str] = []
-    buf_parts: list[str] = []
-    in_quotes = False
-    current_physical_count = 0
-    stitched_records = 0
-    max_physical = 1
-
-    def process_line_for_quotes(line: str, in_q: bool) -> bool:
-        i = 0
-        while i < len(line):
-            if line[i] == '"':
-                # Escaped quote: ""
-                if i + 1 < len(line) and line[i + 1] == '"':
-                    i += 2
-                    continue
-                in_q = not in_q
-            i += 1
-        return in_q
-
-    for line in lines:
-        current_physical_count += 1
-
-        if not buf_parts:
-            buf_parts.append(line)
-        else:
-            buf_parts.append("\n" + line)
-
-        in_quotes = process_line_for_quotes(line, in_quotes)
-
-        if not in_quotes:
-            combined = "".join(buf_parts)
-            logical_lines.append(combined)
-
-            if current_physical_count > 1:
-                stitched_records += 1
-                max_physical = max(max_physical, current_physical_count)
-
-            buf_parts = []
-            current_physical_count = 0
-
-    if buf_parts:
-        logical_lines.append("".join(buf_parts))
-        if current_physical_count > 1:
-            stitched_records += 1
-            max_physical = max(max_physical, current_physical_count)
+def stitch_csv_records(data: bytes) -> dict:
+    """
+    Finds records whose quoted fields span several physical lines, scanning
+    the UTF-8 bytes of the normalized text (no per-line strings are built).
 
-    stitched_text = "\n".join(logical_lines)
-    stats = {
+    A line flips the in-quotes state iff it holds an odd number of '"'
+    (escaped "" pairs cancel out), so the state after each line is a running
+    XOR of per-line parities; a record ends wherever that state returns to 0.
+    Stitched records keep their embedded newlines, so only stats are returned.
+    """
+    if b'"' not in data:
+        # Most files never quote anything: memchr + count, no arrays at all
+        physical = data.count(b"\n") + 1
+        return {"physical_lines": physical, "logical_lines": physical, "stitched_records": 0, "max_physical_per_record": 1}
+
+    buf = np.frombuffer(data, dtype=np.uint8)
+    newlines = np.flatnonzero(buf == ord("\n"))
+    physical = len(newlines) + 1
+    quotes = np.flatnonzero(buf == ord('"'))
+    quotes_before = np.append(np.searchsorted(quotes, newlines), len(quotes))
+    parity = (np.diff(quotes_before, prepend=0) & 1).astype(np.uint8)
+    in_quotes = np.bitwise_xor.accumulate(parity)
+    ends = np.flatnonzero(in_quotes == 0)
+    if not len(ends) or ends[-1] != physical - 1:
+        # unterminated quote: the remainder counts as one record
+        ends = np.append(ends, physical - 1)
+
+    spans = np.diff(ends, prepend=-1)
+    return {
         "physical_lines": physical,
-        "logical_lines": len(logical_lines),
-        "stitched_records": stitched_records,
-        "max_physical_per_record": max_physical,
+        "logical_lines": int(len(ends)),
+        "stitched_records": int((spans > 1).sum()),
+        "max_physical_per_record": int(spans.max()),
     }
-    return stitched_text, stats
 
 
 def decode_text_with_fallback(path: Path) -> tuple[str, str]:
     data = path.read_bytes()
-    candidates = ["utf-8-sig", "utf-8", "cp1252", "latin-1"]
+
+    # A BOM settles it; otherwise each candidate fails at its first bad byte,
+    # so only the encoding that succeeds decodes the whole buffer
+    if data.startswith(codecs.BOM_UTF8):
+        candidates = ["utf-8-sig", "cp1252", "latin-1"]
+    else:
+        candidates = ["utf-8", "cp1252", "latin-1"]
     last_err: Exception | None = None
 
     for enc in candidates:
@@ -1358,12 +562,16 @@ def decode_text_with_fallback(path: Path) -> tuple[str, str]:
     raise ValueError(f"Could not decode file using common encodings: {last_err}")
 
 
-def normalize_to_utf8_lf(src: Path, dst: Path) -> tuple[Path, list[str], str, dict]:
+def normalize_to_utf8_lf(src: Path) -> tuple[str, list[str], str, dict]:
     log: list[str] = []
     text, enc = decode_text_with_fallback(src)
 
-    normalized = text.replace("\r\n", "\n").replace("\r", "\n")
-    if normalized != text:
+    # Most uploads are plain LF or CRLF: skip the copies that would not change anything
+    normalized = text
+    if "\r" in normalized:
+        normalized = normalized.replace("\r\n", "\n")
+        if "\r" in normalized:
+            normalized = normalized.replace("\r", "\n")
         log.append("Normalized line endings (fixed Windows/Mac-style newlines).")
 
     if enc != "utf-8":
@@ -1371,7 +579,8 @@ def normalize_to_utf8_lf(src: Path, dst: Path) -> tuple[Path, list[str], str, di
     else:
         log.append("Detected encoding: utf-8.")
 
-    stitched, stitch_stats = stitch_csv_records(normalized)
+    data = normalized.encode("utf-8")
+    stitch_stats = stitch_csv_records(data)
     if stitch_stats["stitched_records"] > 0:
         log.append(
             f'Quote stitching: merged {stitch_stats["physical_lines"]} physical lines into '
@@ -1382,8 +591,7 @@ def normalize_to_utf8_lf(src: Path, dst: Path) -> tuple[Path, list[str], str, di
     else:
         log.append("Quote stitching: no multi-line quoted records detected.")
 
-    dst.write_text(stitched, encoding="utf-8", newline="\n")
-    return dst, log, enc, stitch_stats
+    return normalized, log, enc, stitch_stats
 
 
 # ============================
@@ -1391,14 +599,27 @@ def normalize_to_utf8_lf(src: Path, dst: Path) -> tuple[Path, list[str], str, di
 # ============================
 _CANDIDATE_DELIMS = [",", ";", "\t", "|"]
 
+# Number formats (also used by normalize_numeric_strings_df)
+_EURO_NUM_PAT = r"^\(?-?\d{1,3}([.\s]\d{3})*,\d+\)?$"      # 1.234,56 / 1 234,56
+_US_NUM_PAT = r"^\(?-?\d{1,3}(,\d{3})*(\.\d+)?\)?$"        # 1,234.56
+_DEC_COMMA_RE = re.compile(_EURO_NUM_PAT)
+
+# Token classes used when scoring candidate header rows
+_LONG_INT_RE = re.compile(r"\d{6,}")
+_NUMBER_RE = re.compile(r"[-+]?\d+(\.\d+)?")
+_SLASH_DATE_RE = re.compile(r"\d{1,2}/\d{1,2}/\d{2,4}")
+_STAMP_RE = re.compile(r"\d{8}(_\d{6})?$")
+_ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_UNIT_ID_RE = re.compile(r"[A-Za-z]\d{1,3}")  # R17, E10, ...
+_LABEL_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_ALPHA_RE = re.compile(r"[A-Za-z]")
+
 
 def looks_like_header_row(fields: list[str]) -> bool:
     """
     Returns True if the row looks like a header (labels), False if it looks like data.
     More conservative: strong data signals override label-like tokens.
     """
-    import re
-
     if not fields:
         return False
 
@@ -1412,7 +633,7 @@ def looks_like_header_row(fields: list[str]) -> bool:
     first = parts[0]
 
     # If first column is a long integer (incident id), it's almost certainly data
-    if re.fullmatch(r"\d{6,}", first):
+    if _LONG_INT_RE.fullmatch(first):
         return False
 
     # If any cell contains an email, it's data (headers basically never do)
@@ -1431,22 +652,22 @@ def looks_like_header_row(fields: list[str]) -> bool:
 
     for t in parts:
         # numbers
-        if re.fullmatch(r"[-+]?\d+(\.\d+)?", t):
+        if _NUMBER_RE.fullmatch(t):
             numeric_like += 1
             continue
 
         # date/time-ish patterns (common in data rows)
-        if re.match(r"^\d{1,2}/\d{1,2}/\d{2,4}", t) or re.match(r"^\d{8}(_\d{6})?$", t):
+        if _SLASH_DATE_RE.match(t) or _STAMP_RE.match(t):
             date_like += 1
             continue
 
         # unit/id-like values (R17, E10, etc.)
-        if re.fullmatch(r"[A-Za-z]\d{1,3}", t) or re.fullmatch(r"[Rr]\d{1,3}", t):
+        if _UNIT_ID_RE.fullmatch(t):
             id_like += 1
             continue
 
         # header-ish labels: short-ish snake_case / lowercase tokens
-        if re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", t) and ("_" in t or t.islower()) and len(t) <= 24:
+        if _LABEL_RE.fullmatch(t) and ("_" in t or t.islower()) and len(t) <= 24:
             label_like += 1
             continue
 
@@ -1472,21 +693,27 @@ def detect_and_strip_preamble(
     Returns (cleaned_text, log_lines, header_info)
     """
     log: list[str] = []
-    lines = text.splitlines()
-
-    if not lines:
+    if not text:
         log.append("Header detection: empty file.")
         return text, log, {}
 
-    scan_lines = lines[:max_scan_lines]
+    # Blank lines at the end of the file aren't rows; without this the parser
+    # would see an empty record and report it as an import repair
+    if text.endswith("\n\n"):
+        text = text.rstrip("\n") + "\n"
+
+    # Only the first max_scan_lines are ever inspected; don't split the whole file
+    scan_lines = text.split("\n", max_scan_lines)[:max_scan_lines]
 
     # Quote-aware field count per line
     field_counts: list[tuple[int, int]] = []  # (line_index, field_count)
+    parsed: dict[int, list[str]] = {}  # reused when scoring header candidates
     for i, ln in enumerate(scan_lines):
         if not ln.strip():
             continue
         try:
             row = next(csv.reader([ln], delimiter=delimiter))
+            parsed[i] = row
             field_counts.append((i, len(row)))
         except Exception:
             continue
@@ -1510,33 +737,33 @@ def detect_and_strip_preamble(
             )
 
     # Candidate rows matching modal field count (always do this)
-    candidates = [(i, lines[i]) for i, c in field_counts if c == modal_fields]
+    candidates = [(i, scan_lines[i]) for i, c in field_counts if c == modal_fields]
     if not candidates:
         log.append("Header detection: no lines match modal field count.")
         return text, log, {}
 
     # Always include the first non-empty line as a candidate, even if it doesn't match modal count
-    first_non_empty = next((i for i, ln in enumerate(lines) if ln.strip()), None)
+    first_non_empty = next((i for i, ln in enumerate(scan_lines) if ln.strip()), None)
     if first_non_empty is not None and all(i != first_non_empty for i, _ in candidates):
-        candidates.append((first_non_empty, lines[first_non_empty]))
+        candidates.append((first_non_empty, scan_lines[first_non_empty]))
 
     # Stable ordering by line number
     candidates.sort(key=lambda x: x[0])
 
-    import re
-
-    def score_header_line(line: str) -> float:
-        try:
-            parts = next(csv.reader([line], delimiter=delimiter))
-        except Exception:
-            parts = line.split(delimiter)
+    def score_header_line(i: int, line: str) -> float:
+        parts = parsed.get(i)
+        if parts is None:
+            try:
+                parts = next(csv.reader([line], delimiter=delimiter))
+            except Exception:
+                parts = line.split(delimiter)
 
         parts = [p.strip() for p in parts]
         n = len(parts) if parts else 1
 
-        alpha_tokens = sum(1 for p in parts if re.search(r"[A-Za-z]", p))
-        numeric_tokens = sum(1 for p in parts if re.fullmatch(r"[-+]?\d+(\.\d+)?", p))
-        date_like = sum(1 for p in parts if re.match(r"\d{4}-\d{2}-\d{2}", p))
+        alpha_tokens = sum(1 for p in parts if _ALPHA_RE.search(p))
+        numeric_tokens = sum(1 for p in parts if _NUMBER_RE.fullmatch(p))
+        date_like = sum(1 for p in parts if _ISO_DATE_RE.match(p))
 
         uniq_ratio = len(set(parts)) / n
         avg_len = sum(len(p) for p in parts) / n
@@ -1554,7 +781,7 @@ def detect_and_strip_preamble(
 
         return score
 
-    scored = [(i, score_header_line(ln)) for i, ln in candidates]
+    scored = [(i, score_header_line(i, ln)) for i, ln in candidates]
     scored.sort(key=lambda x: x[1], reverse=True)
 
     best_i, best_score = scored[0]
@@ -1629,7 +856,11 @@ def detect_and_strip_preamble(
     else:
         log.append("Header appears to be on the first line (no preamble removed).")
 
-    cleaned_text = "\n".join(lines[best_i:])
+    # Slice past the preamble instead of re-joining every line of the file
+    start = 0
+    for _ in range(best_i):
+        start = text.index("\n", start) + 1
+    cleaned_text = text[start:]
 
     header_info = {
         "header_line_index": best_i,
@@ -1642,12 +873,35 @@ def detect_and_strip_preamble(
     return cleaned_text, log, header_info
 
 
-def detect_delimiter(path: Path) -> tuple[str, list[str]]:
+def _delimiter_consistency(lines: list[str], candidates: list[str]) -> dict[str, float]:
+    """
+    Scores each candidate by how consistently it splits the sample lines:
+    the modal non-zero per-line count times the fraction of lines that hit
+    it. Unlike mean-minus-stdev this isn't dragged down by a few ragged or
+    preamble lines, and a delimiter that never appears scores 0.
+    """
+    if not lines:
+        return {d: -1.0 for d in candidates}
+
+    counts = np.array([[ln.count(d) for d in candidates] for ln in lines], dtype=np.int32)
+    scores: dict[str, float] = {}
+    for j, d in enumerate(candidates):
+        col = counts[:, j]
+        nonzero = col[col > 0]
+        if not len(nonzero):
+            scores[d] = 0.0
+            continue
+        modal = int(np.bincount(nonzero).argmax())
+        scores[d] = modal * float(np.mean(col == modal))
+    return scores
+
+
+def detect_delimiter(text: str) -> tuple[str, list[str]]:
     """
     Legacy delimiter detection. Keep for reference, but prefer guess_delimiter_euro_aware().
     """
     log: list[str] = []
-    sample = path.read_text(encoding="utf-8")[:8192]
+    sample = text[:8192]
     lines = [ln for ln in sample.splitlines() if ln.strip()][:20]
     sniff_sample = "\n".join(lines)
 
@@ -1660,46 +914,81 @@ def detect_delimiter(path: Path) -> tuple[str, list[str]]:
     except Exception:
         pass
 
-    best = ","
-    best_score = -1.0
-    for d in _CANDIDATE_DELIMS:
-        counts = [ln.count(d) for ln in lines if ln]
-        if not counts:
-            continue
-        avg = sum(counts) / len(counts)
-        var = sum((c - avg) ** 2 for c in counts) / len(counts)
-        score = avg - (var ** 0.5)
-        if score > best_score:
-            best_score = score
-            best = d
+    scores = _delimiter_consistency(lines, _CANDIDATE_DELIMS)
+    best = max(scores, key=scores.get)
 
     log.append(f"Detected delimiter: {repr(best)} (heuristic).")
     return best, log
 
 
+_DELIMITER_LABELS = {"\t": "TAB", ",": "Comma", ";": "Semicolon", "|": "Pipe"}
+
+
 def delimiter_label(d: str) -> str:
-    return {"\t": "TAB", ",": "Comma", ";": "Semicolon", "|": "Pipe"}.get(d, d)
+    return _DELIMITER_LABELS.get(d, d)
 
 
 def cleaned_download_name(delim: str) -> str:
     return "cleaned.tsv" if delim == "\t" else "cleaned.csv"
 
 
-def read_csv_lenient(path: Path, delimiter: str) -> tuple[pd.DataFrame, list[str], bool, list[int]]:
+def _read_csv_arrow(text: str, delimiter: str) -> pd.DataFrame | None:
+    """
+    Fast path for read_csv_lenient using pyarrow's CSV reader, with every
+    column read as a string. Returns None whenever the Python reader is
+    needed instead: pyarrow missing, ragged or unparseable rows, or blank
+    lines, which csv.reader yields as empty rows that get padded and counted
+    as repairs.
+    """
+    if pa_csv is None:
+        return None
+
+    header = next(csv.reader(io.StringIO(text), delimiter=delimiter), None)
+    if not header or len(header) < 2 or len(header) > MAX_COLS:
+        return None
+
+    if text.startswith("\n") or "\n\n" in text:
+        return None
+    data = text.encode("utf-8")
+
+    names = [f"c{i}" for i in range(len(header))]
+    try:
+        table = pa_csv.read_csv(
+            pa.py_buffer(data),
+            read_options=pa_csv.ReadOptions(column_names=names, block_size=8 << 20),
+            parse_options=pa_csv.ParseOptions(delimiter=delimiter, newlines_in_values=True, ignore_empty_lines=False),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={n: pa.string() for n in names},
+                strings_can_be_null=False,
+                quoted_strings_can_be_null=False,
+            ),
+        )
+    except (pa.ArrowInvalid, ValueError):
+        return None
+
+    if table.num_rows > MAX_ROWS + 1:
+        raise ValueError(f"Too many rows. Limit is {MAX_ROWS:,} data rows.")
+    if table.num_rows < 2:
+        return None
+
+    df = table.slice(1).to_pandas()
+    df.columns = header
+    return df
+
+
+def read_csv_lenient(text: str, delimiter: str) -> tuple[pd.DataFrame, list[str], bool, list[int]]:
     import_log: list[str] = []
-    rows: list[list[str]] = []
 
-    with path.open("r", encoding="utf-8", newline="") as f:
-        reader = csv.reader(f, delimiter=delimiter)
-        for r in reader:
-            rows.append(r)
-            if len(rows) > (MAX_ROWS + 1):
-                raise ValueError(f"Too many rows. Limit is {MAX_ROWS:,} data rows.")
+    df = _read_csv_arrow(text, delimiter)
+    if df is not None:
+        import_log.append("Row structure was consistent (no import repairs needed).")
+        return df, import_log, False, []
 
-    if not rows:
+    reader = csv.reader(io.StringIO(text), delimiter=delimiter)
+    header = next(reader, None)
+    if header is None:
         raise ValueError("File appears empty or could not be parsed.")
 
-    header = rows[0]
     n = len(header)
     if n > MAX_COLS:
         raise ValueError(f"Too many columns. Limit is {MAX_COLS:,} columns.")
@@ -1708,25 +997,20 @@ def read_csv_lenient(path: Path, delimiter: str) -> tuple[pd.DataFrame, list[str
     fixed_too_short = 0
     repaired_indices: list[int] = []
 
-    cleaned_rows = [header]
-    df_row_index = 0
-
-    for r in rows[1:]:
-        repaired = False
-        if len(r) > n:
-            r = r[:n]
-            fixed_too_long += 1
-            repaired = True
-        elif len(r) < n:
-            r = r + [""] * (n - len(r))
-            fixed_too_short += 1
-            repaired = True
-
-        if repaired:
-            repaired_indices.append(df_row_index)
-
-        cleaned_rows.append(r)
-        df_row_index += 1
+    # Repair rows as they are read so there is only one list of rows.
+    rows: list[list[str]] = []
+    for r in reader:
+        if len(rows) >= MAX_ROWS:
+            raise ValueError(f"Too many rows. Limit is {MAX_ROWS:,} data rows.")
+        if len(r) != n:
+            if len(r) > n:
+                del r[n:]
+                fixed_too_long += 1
+            else:
+                r.extend([""] * (n - len(r)))
+                fixed_too_short += 1
+            repaired_indices.append(len(rows))
+        rows.append(r)
 
     import_warning = (fixed_too_long > 0) or (fixed_too_short > 0)
 
@@ -1737,11 +1021,48 @@ def read_csv_lenient(path: Path, delimiter: str) -> tuple[pd.DataFrame, list[str
     if not import_warning:
         import_log.append("Row structure was consistent (no import repairs needed).")
 
-    df = pd.DataFrame(cleaned_rows[1:], columns=cleaned_rows[0])
+    df = pd.DataFrame(rows, columns=header)
     return df, import_log, import_warning, repaired_indices
 
 
-def guess_delimiter_euro_aware(path: Path, candidates: list[str] | None = None) -> tuple[str, list[str]]:
+def _write_csv_arrow(df: pd.DataFrame, path: Path, delimiter: str) -> bool:
+    """
+    Fast path for write_clean_csv. pyarrow can only quote every string or
+    none, so it runs unquoted and gives up (False) as soon as a cell would
+    need quotes. Float columns are left to pandas, whose repr formatting
+    differs from Arrow's (7.0 vs 7). The header goes through csv.writer so
+    it is quoted exactly like pandas would.
+    """
+    if pa_csv is None or len(df.columns) < 2:  # pandas quotes "" in a one-column row
+        return False
+    if any(pd.api.types.is_float_dtype(t) for t in df.dtypes):
+        return False
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return False
+
+    header = io.StringIO()
+    csv.writer(header, delimiter=delimiter, lineterminator="\n").writerow(df.columns)
+    try:
+        with path.open("wb") as f:
+            f.write(header.getvalue().encode("utf-8"))
+            pa_csv.write_csv(
+                table,
+                f,
+                pa_csv.WriteOptions(include_header=False, delimiter=delimiter, quoting_style="none"),
+            )
+    except pa.ArrowInvalid:
+        return False
+    return True
+
+
+def write_clean_csv(df: pd.DataFrame, path: Path, delimiter: str) -> None:
+    if not _write_csv_arrow(df, path, delimiter):
+        df.to_csv(path, index=False, encoding="utf-8", lineterminator="\n", sep=delimiter)
+
+
+def guess_delimiter_euro_aware(text: str, candidates: list[str] | None = None) -> tuple[str, list[str]]:
     """
     Improved delimiter detection:
     - Uses csv.Sniffer when possible
@@ -1754,7 +1075,7 @@ def guess_delimiter_euro_aware(path: Path, candidates: list[str] | None = None)
     if candidates is None:
         candidates = [",", ";", "\t", "|"]
 
-    sample = path.read_text(encoding="utf-8")[:16384]
+    sample = text[:16384]
     lines = [ln for ln in sample.splitlines() if ln.strip()][:30]
     sniff_sample = "\n".join(lines)
 
@@ -1768,16 +1089,6 @@ def guess_delimiter_euro_aware(path: Path, candidates: list[str] | None = None)
     except Exception:
         pass
 
-    def consistency_score(delim: str) -> float:
-        counts = [ln.count(delim) for ln in lines]
-        if not counts:
-            return -1.0
-        avg = sum(counts) / len(counts)
-        var = sum((c - avg) ** 2 for c in counts) / len(counts)
-        return avg - (var ** 0.5)
-
-    dec_comma_re = re.compile(r"^\(?-?\d{1,3}([.\s]\d{3})*,\d+\)?$")
-
     def decimal_comma_density(delim: str) -> float:
         tokens = []
         for ln in lines:
@@ -1785,10 +1096,10 @@ def guess_delimiter_euro_aware(path: Path, candidates: list[str] | None = None)
             tokens.extend(parts)
         if not tokens:
             return 0.0
-        matches = sum(1 for t in tokens if dec_comma_re.match(t))
+        matches = sum(1 for t in tokens if _DEC_COMMA_RE.match(t))
         return matches / len(tokens)
 
-    scores = {d: consistency_score(d) for d in candidates}
+    scores = _delimiter_consistency(lines, candidates)
     best = max(scores, key=scores.get)
 
     if "," in scores and ";" in scores:
@@ -1805,83 +1116,108 @@ def guess_delimiter_euro_aware(path: Path, candidates: list[str] | None = None)
 # Cleaning
 # ============================
 
-def normalize_numeric_strings_df(df: pd.DataFrame) -> tuple[pd.DataFrame, list[str]]:
+def _parse_number_strings(t: pd.Series) -> pd.Series:
+    """
+    Vectorized parse of stripped, non-empty strings into floats (NaN where
+    a value isn't a recognized EU/US number). Parentheses mean negative and
+    currency symbols are ignored.
+    """
+    neg = t.str.startswith("(") & t.str.endswith(")")
+    if neg.any():
+        t = t.where(~neg, t.str.slice(1, -1).str.strip())
+    if t.str.contains(r"[$€£]").any():
+        t = t.str.replace(r"[$€£]", "", regex=True).str.strip()
+
+    euro = t.str.match(_EURO_NUM_PAT)
+    if euro.any():
+        euro_t = t.str.replace(" ", "", regex=False).str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+        t = t.where(~euro, euro_t)
+        us = ~euro & t.str.match(_US_NUM_PAT)
+    else:
+        us = t.str.match(_US_NUM_PAT)
+    cleaned = t.str.replace(",", "", regex=False).where(us, t.where(euro))
+
+    num = pd.to_numeric(cleaned, errors="coerce").astype("float64")
+    return num.where(~neg, -num)
+
+
+def _map_columns(fn, columns: list[pd.Series]) -> list:
+    """fn over each column, on COLUMN_WORKERS threads when there is more than one column."""
+    workers = min(COLUMN_WORKERS, len(columns))
+    if workers <= 1:
+        return [fn(s) for s in columns]
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(fn, columns))
+
+
+def _numeric_column(s: pd.Series) -> pd.Series | None:
+    """The parsed column, or None when it doesn't look numeric enough to convert."""
+    t = s.dropna().astype(str).str.strip()
+    non_empty = t[t != ""]
+    if non_empty.empty:
+        return None
+
+    conv = _parse_number_strings(non_empty)
+    success = conv.notna().mean()
+
+    # Only convert if we are pretty confident this is a numeric column
+    if success >= 0.85 and len(non_empty) >= 5:
+        # Convert whole column (blanks become NaN)
+        return conv.reindex(s.index)
+    return None
+
+
+def normalize_numeric_strings_df(df: pd.DataFrame) -> tuple[pd.DataFrame, list[str], int]:
     """
     Convert common money/number formats to numeric:
     - European: 1.234,56 -> 1234.56
     - US: 1,234.56 -> 1234.56
     - Parentheses negatives: (12,34) -> -12.34
     Only converts a column if conversion succeeds for most non-empty values.
+    Returns (df, log, number of columns converted).
     """
     log: list[str] = []
     converted_cols = 0
 
-    euro_re = re.compile(r"^\(?-?\d{1,3}([.\s]\d{3})*,\d+\)?$")      # 1.234,56 / 1 234,56
-    us_re   = re.compile(r"^\(?-?\d{1,3}(,\d{3})*(\.\d+)?\)?$")      # 1,234.56
-
-    def to_float_safe(s: str) -> float | None:
-        if s is None:
-            return None
-        t = str(s).strip()
-        if not t:
-            return None
+    cols = [c for c in df.columns if df[c].dtype == object or pd.api.types.is_string_dtype(df[c])]
+    for col, conv in zip(cols, _map_columns(_numeric_column, [df[c] for c in cols])):
+        if conv is not None:
+            df[col] = conv
+            converted_cols += 1
 
-        neg = False
-        if t.startswith("(") and t.endswith(")"):
-            neg = True
-            t = t[1:-1].strip()
-
-        # remove currency symbols and spaces around
-        t = t.replace("$", "").replace("€", "").replace("£", "").strip()
-
-        # Euro style: thousands '.' or space, decimal ','
-        if euro_re.match(t):
-            t = t.replace(" ", "")
-            t = t.replace(".", "")
-            t = t.replace(",", ".")
-        # US style: thousands ',', decimal '.'
-        elif us_re.match(t):
-            t = t.replace(",", "")
-        else:
-            return None
+    if converted_cols:
+        log.append(f"Normalized numeric formats in {converted_cols} column(s) (EU/US separators, parentheses negatives).")
+    else:
+        log.append("Numeric normalization: no eligible numeric columns detected.")
+    return df, log, converted_cols
 
-        try:
-            v = float(t)
-            return -v if neg else v
-        except Exception:
-            return None
 
+def downcast_integral_floats(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Float columns whose values are all whole numbers become (nullable) ints,
+    which to_csv formats ~2x faster than floats. Lossless: blanks stay blank.
+    """
     for col in df.columns:
         s = df[col]
-        if not (s.dtype == object or pd.api.types.is_string_dtype(s)):
+        if not pd.api.types.is_float_dtype(s):
             continue
-
-        non_empty = s.dropna().map(lambda x: str(x).strip()).loc[lambda x: x != ""]
-        if non_empty.empty:
+        vals = s.dropna()
+        if vals.empty or not ((vals % 1 == 0).all() and (vals.abs() < 2**53).all()):
             continue
+        df[col] = s.astype("Int64" if len(vals) < len(s) else "int64")
+    return df
 
-        conv = non_empty.map(to_float_safe)
-        success = conv.notna().mean()
-
-        # Only convert if we are pretty confident this is a numeric column
-        if success >= 0.85 and len(non_empty) >= 5:
-            # Convert whole column (preserve blanks)
-            new_col = s.map(lambda x: to_float_safe(x) if str(x).strip() != "" else None)
-            df[col] = pd.to_numeric(new_col, errors="coerce")
-            converted_cols += 1
 
-    if converted_cols:
-        log.append(f"Normalized numeric formats in {converted_cols} column(s) (EU/US separators, parentheses negatives).")
-    else:
-        log.append("Numeric normalization: no eligible numeric columns detected.")
-    return df, log
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_WS_RE = re.compile(r"\s+")
+_UNDERSCORES_RE = re.compile(r"_+")
 
 
 def snake_case(name: str) -> str:
     s = str(name).strip().lower()
-    s = re.sub(r"[^\w\s]", "", s)
-    s = re.sub(r"\s+", "_", s)
-    s = re.sub(r"_+", "_", s)
+    s = _PUNCT_RE.sub("", s)
+    s = _WS_RE.sub("_", s)
+    s = _UNDERSCORES_RE.sub("_", s)
     s = s.strip("_")
     return s or "col"
 
@@ -1908,20 +1244,33 @@ def normalize_columns(df: pd.DataFrame) -> tuple[pd.DataFrame, list[str]]:
     return df, log
 
 
+def _trim_column(s: pd.Series) -> tuple[pd.Series | None, int]:
+    """(stripped column, cells changed); None when the column can stay as it is."""
+    try:
+        stripped = s.str.strip()
+    except AttributeError:
+        # object column without string values: nothing to trim
+        return None, 0
+    if s.dtype == object:
+        # .str yields NaN for non-string cells; keep those values as they were
+        stripped = stripped.where(stripped.notna(), s)
+    changed = int((s.ne(stripped) & s.notna()).sum())
+    if not changed:
+        # Already clean (the common case): keep the original column
+        return None, 0
+    return stripped, changed
+
+
 def trim_whitespace_df(df: pd.DataFrame) -> tuple[pd.DataFrame, list[str]]:
     log: list[str] = []
+    cols = [c for c in df.columns if df[c].dtype == object or pd.api.types.is_string_dtype(df[c])]
+    text_cols = len(cols)
     changed_total = 0
-    text_cols = 0
 
-    for col in df.columns:
-        s = df[col]
-        if s.dtype == object or pd.api.types.is_string_dtype(s):
-            before = s.copy()
-            after = before.map(lambda x: x.strip() if isinstance(x, str) else x)
-            changed = int((before.ne(after) & before.notna()).sum())
+    for col, (stripped, changed) in zip(cols, _map_columns(_trim_column, [df[c] for c in cols])):
+        if stripped is not None:
             changed_total += changed
-            text_cols += 1
-            df[col] = after
+            df[col] = stripped
 
     if text_cols == 0:
         log.append("No text columns found for whitespace cleanup.")
@@ -1936,18 +1285,19 @@ def trim_whitespace_df(df: pd.DataFrame) -> tuple[pd.DataFrame, list[str]]:
 def remove_duplicates_and_empty_rows(df: pd.DataFrame) -> tuple[pd.DataFrame, list[str]]:
     log: list[str] = []
 
-    before = len(df)
-    df2 = df.dropna(how="all")
-    removed_empty = before - len(df2)
-    log.append(f"Removed {removed_empty:,} fully empty rows." if removed_empty else "No fully empty rows found.")
-    df = df2
+    # Both masks come from the same frame so rows are sliced once.
+    # Cells are already trimmed here, so "" covers whitespace-only cells too.
+    empty_mask = (df.isna() | df.eq("")).all(axis=1)
+    dup_mask = df.duplicated(keep="first") & ~empty_mask
 
-    before = len(df)
-    df2 = df.drop_duplicates()
-    removed_dupes = before - len(df2)
+    removed_empty = int(empty_mask.sum())
+    removed_dupes = int(dup_mask.sum())
+    log.append(f"Removed {removed_empty:,} fully empty rows." if removed_empty else "No fully empty rows found.")
     log.append(f"Removed {removed_dupes:,} duplicate rows (exact matches)." if removed_dupes else "No exact duplicate rows found.")
 
-    return df2, log
+    if removed_empty or removed_dupes:
+        df = df.loc[~(empty_mask | dup_mask)]
+    return df, log
 
 
 def clean_csv(df: pd.DataFrame) -> tuple[pd.DataFrame, list[str]]:
@@ -1961,34 +1311,41 @@ def clean_csv(df: pd.DataFrame) -> tuple[pd.DataFrame, list[str]]:
 # ============================
 # Near-duplicates
 # ============================
+# Column names that identify rather than describe a row (ids, refs, timestamps,
+# running balances); these can differ between otherwise identical rows
+_IGNORE_COL_RE = re.compile(
+    r"^id$|_id$|^id_|_id_|uuid|guid|transaction|txn|reference|^ref$|ref_|_ref$"
+    r"|date|time|_at$|balance|running_total|remaining"
+)
+
+
 def _should_ignore_col(col: str) -> bool:
-    s = str(col).lower().strip()
-    if s == "id" or s.endswith("_id") or s.startswith("id_") or "_id_" in s:
-        return True
-    if "uuid" in s or "guid" in s:
-        return True
-    if "transaction" in s or "txn" in s:
-        return True
-    if "reference" in s or s in {"ref", "reference"} or "ref_" in s or s.endswith("_ref"):
-        return True
-    if "date" in s or "time" in s or "timestamp" in s or s.endswith("_at"):
-        return True
-    if "balance" in s or "running_total" in s or "remaining" in s:
-        return True
-    return False
-
-
-def _normalize_text_for_compare(x: Any) -> str:
-    if x is None:
-        return ""
-    s = str(x)
-    s = re.sub(r"\s+", " ", s)
-    return s.strip().lower()
+    return _IGNORE_COL_RE.search(str(col).lower().strip()) is not None
+
+
+# The characters str.split() splits on. RE2 (the Arrow string kernels) reads
+# \s as [\t\n\f\r ] only, so vertical tab and the Unicode spaces are spelled out.
+_COMPARE_WS_PAT = "[\\s\x0b\x1c-\x1f\x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000]+"
+
 
+def _normalize_text_for_compare(s: pd.Series) -> pd.Series:
+    """Collapse whitespace, trim and lowercase a column for near-dupe comparison."""
+    s = s.astype(str).str.replace(_COMPARE_WS_PAT, " ", regex=True)
+    return s.str.strip(" ").str.lower()
 
-def _row_to_dict(df: pd.DataFrame, idx: int) -> dict:
-    row = df.iloc[idx].to_dict()
-    return {k: _json_safe(v) for k, v in row.items()}
+
+def _compare_column(s: pd.Series) -> pd.Series:
+    """A column as near-dupe comparison sees it: blanks for missing values, text normalized."""
+    s = s.fillna("")
+    if pd.api.types.is_string_dtype(s) or s.dtype == object:
+        return _normalize_text_for_compare(s)
+    return s
+
+
+def _rows_to_dicts(df: pd.DataFrame, positions: list[int]) -> list[dict]:
+    """JSON-ready dicts for the given row positions (NaN/NA become None)."""
+    rows = df.iloc[positions].astype(object)
+    return rows.where(rows.notna(), None).to_dict(orient="records")
 
 
 def analyze_near_duplicates(df: pd.DataFrame, max_examples: int = 5) -> tuple[list[str], int, list[dict], pd.Series]:
@@ -1999,27 +1356,38 @@ def analyze_near_duplicates(df: pd.DataFrame, max_examples: int = 5) -> tuple[li
         dup_mask = pd.Series([False] * len(df), index=df.index)
         return ignored_cols, 0, [], dup_mask
 
-    comp = df[compare_cols].copy().fillna("")
-    for c in comp.columns:
-        if pd.api.types.is_string_dtype(comp[c]) or comp[c].dtype == object:
-            comp[c] = comp[c].map(_normalize_text_for_compare)
+    # Built column by column so text columns are only materialized once, normalized
+    comp = pd.DataFrame(
+        dict(zip(compare_cols, _map_columns(_compare_column, [df[c] for c in compare_cols]))),
+        index=df.index,
+        copy=False,
+    )
 
-    dup_mask = comp.duplicated(keep="first")
+    # One 64-bit fingerprint per row instead of a multi-key groupby over every column
+    fp = pd.util.hash_pandas_object(comp, index=False)
+    dup_mask = fp.duplicated(keep="first")
     dup_count = int(dup_mask.sum())
 
-    examples: list[dict] = []
+    pairs: list[tuple[int, int]] = []
     if dup_count > 0:
-        groups = comp.groupby(list(comp.columns), sort=False).indices
-        for _, idxs in groups.items():
-            if len(idxs) >= 2:
-                kept = idxs[0]
-                for rem in idxs[1:]:
-                    examples.append({"kept": _row_to_dict(df, int(kept)), "removed": _row_to_dict(df, int(rem))})
-                    if len(examples) >= max_examples:
-                        break
-            if len(examples) >= max_examples:
+        pos = np.flatnonzero(fp.duplicated(keep=False).to_numpy())
+        groups = fp.iloc[pos].groupby(fp.iloc[pos], sort=False).indices
+        for idxs in groups.values():
+            kept, *removed = pos[idxs]
+            kept_vals = comp.iloc[kept].tolist()
+            for rem in removed:
+                if comp.iloc[rem].tolist() != kept_vals:
+                    continue  # fingerprint collision, not a real match
+                pairs.append((int(kept), int(rem)))
+                if len(pairs) >= max_examples:
+                    break
+            if len(pairs) >= max_examples:
                 break
 
+    # One frame slice for every example row instead of a per-cell NaN scrub
+    rows = _rows_to_dicts(df, [p for pair in pairs for p in pair])
+    examples = [{"kept": rows[2 * i], "removed": rows[2 * i + 1]} for i in range(len(pairs))]
+
     return ignored_cols, dup_count, examples, dup_mask
 
 
@@ -2033,20 +1401,47 @@ def render_near_dupe_compare_table(ex: dict, mode: str) -> str:
         if k not in cols:
             cols.append(k)
 
-    kept_row = {"status": "Kept", **{k: kept.get(k) for k in cols}}
-    rem_row = {"status": removed_label, **{k: removed.get(k) for k in cols}}
-
-    df = pd.DataFrame([kept_row, rem_row])
-    return df.to_html(index=False, escape=True)
+    rows = [
+        ["Kept", *(kept.get(k) for k in cols)],
+        [removed_label, *(removed.get(k) for k in cols)],
+    ]
+    return html_table(["status", *cols], rows)
 
 
 # ============================
 # Previews
 # ============================
+# Keep embedded control characters and doubled spaces visible in previews
+_CELL_ESCAPES = str.maketrans({"\t": "\\t", "\r": "\\r", "\n": "\\n"})
+
+
+def _cell_html(v: Any) -> str:
+    v = _json_safe(v)
+    if v is None:
+        return ""
+    return html.escape(str(v).translate(_CELL_ESCAPES), quote=False).replace("  ", "&nbsp;&nbsp;")
+
+
+def html_table(columns: list, rows) -> str:
+    """
+    Builds a plain <table> from column names and row sequences. Cells are
+    escaped once each and formatted into a precomputed row template.
+    """
+    head = "".join(f"<th>{_cell_html(c)}</th>" for c in columns)
+    row_tmpl = "<tr>" + "<td>{}</td>" * len(columns) + "</tr>"
+    body = "\n".join(row_tmpl.format(*map(_cell_html, row)) for row in rows)
+    return (
+        '<table border="1" class="dataframe">\n'
+        f"<thead><tr>{head}</tr></thead>\n"
+        f"<tbody>\n{body}\n</tbody>\n"
+        "</table>"
+    )
+
+
 def df_to_html_table(df: pd.DataFrame) -> str:
     if df is None or df.empty:
         return "<p class='muted'>No rows to display.</p>"
-    return df.to_html(index=False, escape=True)
+    return html_table(list(df.columns), df.itertuples(index=False, name=None))
 
 
 def build_previews(df: pd.DataFrame, repaired_indices: list[int]) -> tuple[str, str, str]:
@@ -2064,27 +1459,176 @@ def build_previews(df: pd.DataFrame, repaired_indices: list[int]) -> tuple[str,
     return df_to_html_table(first_df), df_to_html_table(last_df), repaired_html
 
 
+# Changelog lines that describe a change to the data (vs. a check that passed)
+_REPAIR_LINE_RE = re.compile(
+    r"^(?:Fixed |Removed |Normalized |Header missing|Header detected)"
+    r"|Converted to UTF-8"
+    r"|Quote stitching: merged"
+)
+
+
+def split_changelog(changelog: list[str]) -> dict[str, list[str]]:
+    """
+    Splits the user-facing changelog into the result page's two lists.
+    """
+    repairs_applied: list[str] = []
+    checks_passed: list[str] = []
+    for item in changelog:
+        (repairs_applied if _REPAIR_LINE_RE.search(item.strip()) else checks_passed).append(item)
+    return {"repairs_applied": repairs_applied, "checks_passed": checks_passed}
+
+
+def result_pills(
+    job_id: str,
+    paid: bool,
+    import_warning: bool,
+    near_dupes_mode: str,
+    delim: str,
+    numbers_normalized: bool,
+    header_detected: bool,
+) -> list[list[tuple[str, str | None]]]:
+    """
+    Returns the two rows of status pills shown on the result page.
+    A value of None renders the label alone, styled as a warning.
+    """
+    status: list[tuple[str, str | None]] = [("Job", job_id), ("Paid", "yes" if paid else "no")]
+    if import_warning:
+        status.append(("Import repaired", None))
+    if near_dupes_mode:
+        status.append(("Near-dupes", near_dupes_mode))
+    if delim:
+        status.append(("Delimiter", delimiter_label(delim)))
+
+    formats: list[tuple[str, str | None]] = [
+        ("Encoding", "UTF-8"),  # because we normalize to UTF-8 in the pipeline
+        ("Numbers", "Normalized" if numbers_normalized else "Unchanged"),
+        ("Header", "Auto-detected" if header_detected else "First row"),
+    ]
+    return [status, formats]
+
+
 # ============================
 # Payment helper
 # ============================
 def is_payment_pending(m: dict) -> bool:
     return bool(PAYMENTS_ENABLED and (not m.get("paid")) and m.get("stripe_session_id"))
 
+# ============================
+# Page rendering
+# ============================
+# Cached pages are validated by ETag only: a boot-time Last-Modified would
+# differ per worker and move on every restart
+PAGE_MAX_AGE = 300
+
+
+def _page(html_text: str) -> tuple[bytes, str]:
+    body = html_text.encode("utf-8")
+    return body, hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
+@lru_cache(maxsize=32)
+def _render_index(
+    max_mb: int,
+    max_rows: int,
+    max_cols: int,
+    support_email: str,
+    error: str | None,
+) -> tuple[bytes, str]:
+    return _page(
+        render_template(
+            "index.html",
+            error=error,
+            max_mb=max_mb,
+            max_rows=max_rows,
+            max_cols=max_cols,
+            support_email=support_email,
+        )
+    )
+
+
+@lru_cache(maxsize=None)
+def _render_problem(slug: str | None) -> tuple[bytes, str]:
+    if slug is None:
+        return _page(render_template("problems/index.html", problems=PROBLEMS))
+    return _page(render_template("problems/problem.html", slug=slug, page=PROBLEMS[slug]))
+
+
+def static_page(page: tuple[bytes, str], mimetype: str = "text/html", max_age: int = PAGE_MAX_AGE):
+    """
+    Serves a cached (body, etag) render with its ETag, answering a
+    matching If-None-Match with an empty 304.
+    """
+    body, etag = page
+    resp = app.response_class(body, mimetype=mimetype)
+    resp.set_etag(etag)
+    resp.cache_control.public = True
+    resp.cache_control.max_age = max_age
+    return resp.make_conditional(request)
+
+
+# The payment return pages only substitute a couple of escaped values, so they
+# are plain str.format_map templates rather than Jinja (CSS braces are doubled)
+SUCCESS_PAGE = """\
+<!doctype html>
+<html>
+<head>
+  <meta charset="utf-8" />
+  <title>CleanCSV — Payment received</title>
+  <meta name="viewport" content="width=device-width, initial-scale=1" />
+  <style>
+    body {{ font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial, sans-serif; margin: 0; background:#fff; color:#111; }}
+    .wrap {{ max-width: 920px; margin: 0 auto; padding: 40px 20px 28px; }}
+    .btn {{ display:inline-block; padding: 10px 14px; border-radius: 10px; border: 1px solid #111; background: #111; color: #fff; text-decoration:none; font-weight:600; }}
+    .muted {{ color: #666; font-size: 14px; line-height:1.45; }}
+    footer {{ border-top: 1px solid #f0f0f0; margin-top: 28px; padding-top: 18px; color: #666; font-size: 13px; }}
+  </style>
+</head>
+<body>
+  <div class="wrap">
+    <h1 style="margin:0 0 8px;">Payment received</h1>
+    <p class="muted" style="margin-top:0;">You're good to go.</p>
+    <p><a class="btn" href="/download/{job_id}">Download cleaned file</a></p>
+    <p class="muted">Need help? Email {support_email} and include Job ID: {job_id}</p>
+    <p class="muted"><a href="/result/{job_id}">Back to results</a></p>
+    <footer>Files are not stored • Support: {support_email}</footer>
+  </div>
+</body>
+</html>
+"""
+
+CANCEL_PAGE = """\
+<!doctype html>
+<html>
+<head><meta charset="utf-8" /><title>CleanCSV — Payment canceled</title></head>
+<body style="font-family:system-ui,sans-serif;margin:40px;">
+  <h1>Payment canceled</h1>
+  <p><a href="/">Back to upload</a></p>
+</body>
+</html>
+"""
+
+
+def render_success(job_id: str) -> str:
+    return SUCCESS_PAGE.format_map({"job_id": html.escape(job_id), "support_email": html.escape(SUPPORT_EMAIL)})
+
+
+def render_index(error: str | None = None):
+    """
+    The landing page only depends on config and an optional error message,
+    so renders are memoized on that tuple and served as cached bytes.
+    Error renders are responses to a POST and skip the cache validators.
+    """
+    page = _render_index(MAX_BYTES // (1024 * 1024), MAX_ROWS, MAX_COLS, SUPPORT_EMAIL, error)
+    if error is None:
+        return static_page(page)
+    return app.response_class(page[0], mimetype="text/html")
+
 # ============================
 # Routes
 # ============================
 
-@app.get("/sitemap.xml")
-def sitemap():
-    pages = [
-        "",
-        "/problems",
-        "/problems/expected-fields-error",
-        "/problems/expected-fields-saw-fields",
-        "/problems/excel-one-column-csv",
-        "/problems/powerbi-decimal-comma-csv",
-        "/problems/csv-encoding-utf8-windows-1252",
-    ]
+def _build_sitemap() -> str:
+    pages = ["", "/problems", *(f"/problems/{slug}" for slug in PROBLEMS)]
 
     xml = ['<?xml version="1.0" encoding="UTF-8"?>']
     xml.append('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">')
@@ -2095,101 +1639,82 @@ def sitemap():
         xml.append("  </url>")
 
     xml.append("</urlset>")
-    return app.response_class("\n".join(xml), mimetype="application/xml")
+    return "\n".join(xml)
 
-@app.get("/problems")
-def problems_index():
-    return render_template_string(PROBLEMS_INDEX_HTML)
 
-@app.get("/problems/csv-encoding-utf8-windows-1252")
-def problem_csv_encoding():
-    return render_template_string(PROBLEM_CSV_ENCODING_HTML)
+# Pages and BASE_URL are fixed at import, so the sitemap is built once
+SITEMAP_PAGE = _page(_build_sitemap())
 
-@app.get("/problems/expected-fields-saw-fields")
-def problem_expected_fields_saw_fields():
-    return render_template_string(PROBLEM_EXPECTED_FIELDS_SAW_FIELDS_HTML)
 
-@app.get("/problems/powerbi-decimal-comma-csv")
-def problem_powerbi_decimal_comma():
-    return render_template_string(PROBLEM_POWERBI_DECIMAL_COMMA_HTML)
+@app.get("/sitemap.xml")
+def sitemap():
+    return static_page(SITEMAP_PAGE, mimetype="application/xml", max_age=3600)
 
-@app.get("/problems/excel-one-column-csv")
-def problem_excel_one_column():
-    return render_template_string(PROBLEM_EXCEL_ONE_COLUMN_HTML)
+@app.get("/problems")
+def problems_index():
+    return static_page(_render_problem(None))
 
-@app.get("/problems/expected-fields-error")
-def problem_expected_fields():
-    return render_template_string(PROBLEM_EXPECTED_FIELDS_HTML)
+@app.get("/problems/<slug>")
+def problem_page(slug: str):
+    if slug not in PROBLEMS:
+        abort(404)
+    return static_page(_render_problem(slug))
 
 @app.get("/favicon.ico")
 def favicon():
-    return ("", 204)
+    return ("", 204, {"Cache-Control": "public, max-age=86400"})
 
 @app.get("/")
 def index():
-    cleanup_old_files()
     log_event("page_view_home", payments_enabled=PAYMENTS_ENABLED)
-    return render_template_string(
-        INDEX_HTML,
-        error=None,
-        max_mb=MAX_BYTES // (1024 * 1024),
-        retention=RETENTION_MINUTES,
-        payments_enabled=PAYMENTS_ENABLED,
-        max_rows=MAX_ROWS,
-        max_cols=MAX_COLS,
-        support_email=SUPPORT_EMAIL,
-    )
+    return render_index()
+
+
+@app.errorhandler(413)
+def upload_too_large(_e):
+    log_event("upload_rejected_file_too_large", file_bytes=request.content_length)
+    return render_index(error=f"File too large. Max is {MAX_BYTES // (1024 * 1024)} MB."), 413
 
 
 @app.post("/upload")
 def upload():
-    cleanup_old_files()
-
     if bytes_too_large(request):
-        log_event("upload_rejected_file_too_large", file_bytes=request.content_length)
-        return render_template_string(
-            INDEX_HTML,
-            error=f"File too large. Max is {MAX_BYTES // (1024 * 1024)} MB.",
-            max_mb=MAX_BYTES // (1024 * 1024),
-            retention=RETENTION_MINUTES,
-            payments_enabled=PAYMENTS_ENABLED,
-            max_rows=MAX_ROWS,
-            max_cols=MAX_COLS,
-            support_email=SUPPORT_EMAIL,
-        ), 413
+        abort(413)
 
     ip = get_client_ip()
-    if not rate_limit_check(ip):
-        log_event("upload_rate_limited")
-        return render_template_string(
-            INDEX_HTML,
-            error=f"Rate limit: too many uploads. Please wait {RATE_WINDOW_SECONDS} seconds and try again.",
-            max_mb=MAX_BYTES // (1024 * 1024),
-            retention=RETENTION_MINUTES,
-            payments_enabled=PAYMENTS_ENABLED,
-            max_rows=MAX_ROWS,
-            max_cols=MAX_COLS,
-            support_email=SUPPORT_EMAIL,
-        ), 429
-
-    f = request.files.get("file")
+    retry_after = rate_limit_check(ip)
+    if retry_after:
+        log_event("upload_rate_limited", retry_after=retry_after)
+        unit = "second" if retry_after == 1 else "seconds"
+        return (
+            render_index(error=f"Rate limit: too many uploads. Please wait {retry_after} {unit} and try again."),
+            429,
+            {"Retry-After": str(retry_after)},
+        )
+
+    # 128 random bits, same 32-hex format as uuid4().hex without the UUID object
+    job_id = secrets.token_hex(16)
+    rp = raw_path(job_id)
+    op = out_path(job_id)
+
+    # The multipart parser writes the upload straight to rp (see UploadRequest)
+    request.upload_path = rp
+    try:
+        f = request.files.get("file")
+    except Exception:
+        # e.g. a 413 partway through a body without Content-Length
+        request.discard_upload()
+        raise
     if not f or not f.filename:
         log_event("upload_missing_file")
+        request.discard_upload()
         abort(400)
 
     original_filename = f.filename
     if not looks_like_csv_name(original_filename):
         log_event("upload_rejected_extension", filename=original_filename)
-        return render_template_string(
-            INDEX_HTML,
-            error="Please upload a .csv or .tsv file (a .txt export is also OK).",
-            max_mb=MAX_BYTES // (1024 * 1024),
-            retention=RETENTION_MINUTES,
-            payments_enabled=PAYMENTS_ENABLED,
-            max_rows=MAX_ROWS,
-            max_cols=MAX_COLS,
-            support_email=SUPPORT_EMAIL,
-        ), 400
+        request.discard_upload()
+        return render_index(error="Please upload a .csv or .tsv file (a .txt export is also OK)."), 400
 
     near_preview = bool(request.form.get("near_dupes_preview"))
     near_remove = bool(request.form.get("near_dupes_remove"))
@@ -2198,11 +1723,6 @@ def upload():
 
     normalize_numbers = bool(request.form.get("normalize_numbers"))
 
-    job_id = uuid.uuid4().hex
-    rp = raw_path(job_id)
-    np = norm_path(job_id)
-    op = out_path(job_id)
-
     log_event(
         "upload_start",
         job_id=job_id,
@@ -2213,24 +1733,23 @@ def upload():
         normalize_numbers=normalize_numbers,
     )
 
-    f.save(rp)
+    if f.stream is request.upload_file:
+        f.close()
+    else:
+        # "file" wasn't the first file part; copy it over in 1 MiB chunks
+        if request.upload_file is not None:
+            request.upload_file.close()
+        with rp.open("wb") as out:
+            shutil.copyfileobj(f.stream, out, 1 << 20)
 
     if not looks_like_text_file(rp):
         log_event("upload_rejected_binary", job_id=job_id)
         rp.unlink(missing_ok=True)
-        return render_template_string(
-            INDEX_HTML,
-            error="That file doesn't look like a text CSV/TSV (binary data detected).",
-            max_mb=MAX_BYTES // (1024 * 1024),
-            retention=RETENTION_MINUTES,
-            payments_enabled=PAYMENTS_ENABLED,
-            max_rows=MAX_ROWS,
-            max_cols=MAX_COLS,
-            support_email=SUPPORT_EMAIL,
-        ), 400
+        return render_index(error="That file doesn't look like a text CSV/TSV (binary data detected)."), 400
 
     # Decode + normalize to UTF-8 + newline normalization + quote stitching
-    parse_path, structural_log, encoding_used, stitch_stats = normalize_to_utf8_lf(rp, np)
+    # The normalized text stays in memory from here to the parser; nothing is re-read from disk
+    text, structural_log, encoding_used, stitch_stats = normalize_to_utf8_lf(rp)
     # Classify quote stitching as repair vs check
     if stitch_stats.get("stitched_records", 0) > 0:
         structural_log.append(
@@ -2243,16 +1762,14 @@ def upload():
     log_event("upload_decoded", job_id=job_id, encoding=encoding_used, **stitch_stats)
 
     # Detect delimiter (EU-aware)
-    delim, delim_log = guess_delimiter_euro_aware(parse_path)
+    delim, delim_log = guess_delimiter_euro_aware(text)
 
     # Header detection (text-based)
-    text = parse_path.read_text(encoding="utf-8")
     text, header_log, header_info = detect_and_strip_preamble(text, delimiter=delim)
-    parse_path.write_text(text, encoding="utf-8", newline="\n")
-    
+
     header_stripped = any("Header detected on line" in x for x in header_log)
 
-    # After stripping, the header is now at line 1 (index 0) in the rewritten file.
+    # After stripping, the header is now at line 1 (index 0) of the text.
     if header_stripped and header_info is not None:
       header_info["header_line_index"] = 0
   
@@ -2276,13 +1793,14 @@ def upload():
 
     # Headerless CSV handling (safe):
     # Never synthesize if header detection selected line 1.
-    file_lines = parse_path.read_text(encoding="utf-8").splitlines()
-
     # If we stripped preamble, header is now at top — never synthesize.
     if header_stripped:
         pass
-    else:
-        file_lines = parse_path.read_text(encoding="utf-8").splitlines()
+    elif text:
+        # Only the first two lines matter; a lone trailing newline isn't a second line
+        file_lines = text.split("\n", 2)[:2]
+        if text == file_lines[0] + "\n":
+            file_lines = file_lines[:1]
 
         if len(file_lines) >= 2:
             line1 = file_lines[0]
@@ -2307,8 +1825,7 @@ def upload():
             # Synthesize only when BOTH look like data
             if (not row1_is_header) and (not row2_is_header):
                 cols = [f"col_{i+1}" for i in range(len(row1_fields))]
-                new_text = delim.join(cols) + "\n" + "\n".join(file_lines) + "\n"
-                parse_path.write_text(new_text, encoding="utf-8", newline="\n")
+                text = delim.join(cols) + "\n" + text
                 structural_log.append("Header missing: generated a synthetic header row (col_1, col_2, …).")
                 log_event("header_missing_synthesized", job_id=job_id, column_count=len(row1_fields))
 
@@ -2323,74 +1840,32 @@ def upload():
             row1_fields = [x.strip() for x in row1]
             if not looks_like_header_row(row1_fields):
                 cols = [f"col_{i+1}" for i in range(len(row1_fields))]
-                new_text = delim.join(cols) + "\n" + line1 + "\n"
-                parse_path.write_text(new_text, encoding="utf-8", newline="\n")
+                text = delim.join(cols) + "\n" + text
                 structural_log.append("Header missing: generated a synthetic header row (col_1, col_2, …).")
                 log_event("header_missing_synthesized", job_id=job_id, column_count=len(row1_fields))
 
     # Lenient parse (pads/truncates rows)
     try:
-        df, import_log, import_warning, repaired_indices = read_csv_lenient(parse_path, delimiter=delim)
+        df, import_log, import_warning, repaired_indices = read_csv_lenient(text, delimiter=delim)
     except ValueError as e:
         log_event("upload_rejected_limits_or_parse", job_id=job_id, error=str(e), delimiter=delim)
         rp.unlink(missing_ok=True)
-        np.unlink(missing_ok=True)
-        return render_template_string(
-            INDEX_HTML,
-            error=str(e),
-            max_mb=MAX_BYTES // (1024 * 1024),
-            retention=RETENTION_MINUTES,
-            payments_enabled=PAYMENTS_ENABLED,
-            max_rows=MAX_ROWS,
-            max_cols=MAX_COLS,
-            support_email=SUPPORT_EMAIL,
-        ), 400
+        return render_index(error=str(e)), 400
 
     # Clean
     df2, clean_log = clean_csv(df)
 
     # Optional numeric normalization
+    numbers_normalized = False
     if normalize_numbers:
-        df2, num_log = normalize_numeric_strings_df(df2)
+        df2, num_log, converted_cols = normalize_numeric_strings_df(df2)
+        numbers_normalized = converted_cols > 0
         clean_log += num_log
         log_event("numeric_normalization", job_id=job_id, notes=num_log)
 
     # Build user-facing changelog (no header debug spam)
     changelog = structural_log + delim_log + header_user_log + import_log + clean_log
-    
-    # --- Split changelog into repairs vs checks (user-facing) ---
-    REPAIR_PREFIXES = (
-        "Fixed ",
-        "Removed ",
-        "Header missing",
-        "Header detected",
-        "generated a synthetic header",
-        "Normalized ",
-        "Detected encoding",
-        "Converted to UTF-8",
-    )
-
-    repairs_applied = []
-    checks_passed = []
 
-    for item in changelog:
-        s = item.strip()
-
-        is_repair = (
-            s.startswith("Fixed ")
-            or s.startswith("Removed ")
-            or s.startswith("Normalized ")
-            or s.startswith("Header missing")
-            or s.startswith("Header detected")
-            or "Converted to UTF-8" in s
-            or "Quote stitching: merged" in s
-        )
-
-        if is_repair:
-            repairs_applied.append(item)
-        else:
-            checks_passed.append(item)
-            
     # Near-dupes (optional)
     near_dupes_mode = ""
     ignored_cols: list[str] = []
@@ -2420,13 +1895,13 @@ def upload():
         )
 
         near_dupe_examples_tables = [
-            render_near_dupe_compare_table(ex, near_dupes_mode) for ex in near_dupe_examples_rows
+            Markup(render_near_dupe_compare_table(ex, near_dupes_mode)) for ex in near_dupe_examples_rows
         ]
 
     # Write output
-    df2.to_csv(op, index=False, encoding="utf-8", lineterminator="\n", sep=delim)
+    df2 = downcast_integral_floats(df2)
+    write_clean_csv(df2, op, delim)
     changelog.append(f"Wrote output as UTF-8 with standard newlines using delimiter {repr(delim)}.")
-    np.unlink(missing_ok=True)
 
     rows, cols = int(df2.shape[0]), int(df2.shape[1])
     preview_first, preview_last, preview_repaired = build_previews(df2, repaired_indices)
@@ -2444,7 +1919,13 @@ def upload():
             "ignored_cols": ignored_cols,
             "near_dupes_count": near_dupes_count,
             "near_dupe_examples_rows": near_dupe_examples_rows,
+            "near_dupe_examples_html": [str(t) for t in near_dupe_examples_tables],
             "detected_delimiter": delim,
+            "numbers_normalized": numbers_normalized,
+            "header_detected": header_stripped,
+            "preview_first_html": preview_first,
+            "preview_last_html": preview_last,
+            "preview_repaired_html": preview_repaired,
             "original_file": rp.name,
             "original_filename": original_filename or "original.csv",
             # optional: keep header debug around for future diagnostics UI
@@ -2454,25 +1935,24 @@ def upload():
 
     log_event("upload_complete", job_id=job_id, delimiter=delim, rows=rows, cols=cols, near_dupes_mode=near_dupes_mode)
 
-    return render_template_string(
-        RESULT_HTML,
+    return render_template(
+        "result.html",
         job_id=job_id,
         rows=rows,
         cols=cols,
-        repairs_applied=repairs_applied,
-        checks_passed=checks_passed,
+        **split_changelog(changelog),
         import_warning=import_warning,
         near_dupes_mode=near_dupes_mode,
         ignored_cols=ignored_cols,
         near_dupe_examples=near_dupe_examples_tables,
-        preview_first=preview_first,
-        preview_last=preview_last,
-        preview_repaired=preview_repaired,
+        preview_first=Markup(preview_first),
+        preview_last=Markup(preview_last),
+        preview_repaired=Markup(preview_repaired),
         retention=RETENTION_MINUTES,
         paid=False,
-        payments_enabled=PAYMENTS_ENABLED,
-        detected_delimiter=delim,
-        detected_delimiter_label=delimiter_label(delim),
+        pill_rows=result_pills(
+            job_id, False, import_warning, near_dupes_mode, delim, numbers_normalized, header_stripped
+        ),
         payment_pending=False,
         support_email=SUPPORT_EMAIL,
     )
@@ -2480,8 +1960,6 @@ def upload():
 
 @app.get("/result/<job_id>")
 def result(job_id: str):
-    cleanup_old_files()
-
     m = read_manifest(job_id)
     op = out_path(job_id)
     if not m or not op.exists():
@@ -2490,48 +1968,38 @@ def result(job_id: str):
 
     delim = m.get("detected_delimiter") or ","
 
-    # Detected formats (for badges)
-    encoding_label = "UTF-8"  # because we normalize to UTF-8 in the pipeline
-    numbers_label = "Normalized" if any("Normalized numeric formats" in c for c in m.get("changelog", [])) else "Unchanged"
-    header_label = "Auto-detected" if any("Header detected" in c for c in m.get("changelog", [])) else "First row"
-    try:
-        df = pd.read_csv(op, encoding="utf-8", sep=delim)
-    except Exception:
-        df = pd.DataFrame()
-
-    repaired_indices = m.get("repaired_row_indices", []) or []
-    preview_first, preview_last, preview_repaired = build_previews(df, repaired_indices)
-
     near_dupes_mode = (m.get("near_dupes_mode") or "").strip()
     ignored_cols = m.get("ignored_cols", []) or []
-    examples_rows = m.get("near_dupe_examples_rows", []) or []
-    near_dupe_examples_tables: List[str] = []
-    if near_dupes_mode and examples_rows:
-        near_dupe_examples_tables = [render_near_dupe_compare_table(ex, near_dupes_mode) for ex in examples_rows]
+    # Compare tables were rendered at upload time, like the previews
+    near_dupe_examples_tables = [Markup(t) for t in m.get("near_dupe_examples_html", []) or []] if near_dupes_mode else []
 
     payment_pending = is_payment_pending(m)
 
-    return render_template_string(
-        RESULT_HTML,
+    return render_template(
+        "result.html",
         job_id=job_id,
         rows=m.get("rows"),
         cols=m.get("cols"),
-        changelog=m.get("changelog", []),
+        **split_changelog(m.get("changelog", []) or []),
         import_warning=bool(m.get("import_warning")),
         near_dupes_mode=near_dupes_mode,
         ignored_cols=ignored_cols,
         near_dupe_examples=near_dupe_examples_tables,
-        preview_first=preview_first,
-        preview_last=preview_last,
-        preview_repaired=preview_repaired,
+        # Rendered once at upload time; no need to re-parse the output file
+        preview_first=Markup(m.get("preview_first_html", "")),
+        preview_last=Markup(m.get("preview_last_html", "")),
+        preview_repaired=Markup(m.get("preview_repaired_html", "")),
         retention=RETENTION_MINUTES,
         paid=bool(m.get("paid")),
-        payments_enabled=PAYMENTS_ENABLED,
-        detected_delimiter=delim,
-        detected_delimiter_label=delimiter_label(delim),
-        encoding_label=encoding_label,
-        numbers_label=numbers_label,
-        header_label=header_label,
+        pill_rows=result_pills(
+            job_id,
+            bool(m.get("paid")),
+            bool(m.get("import_warning")),
+            near_dupes_mode,
+            delim,
+            bool(m.get("numbers_normalized")),
+            bool(m.get("header_detected")),
+        ),
         payment_pending=payment_pending,
         support_email=SUPPORT_EMAIL,
     )
@@ -2539,30 +2007,28 @@ def result(job_id: str):
 
 @app.get("/download_original/<job_id>")
 def download_original(job_id: str):
-    cleanup_old_files()
     m = read_manifest(job_id)
     if not m:
         abort(404)
 
-    p = WORK_DIR / str(m.get("original_file") or "")
-    if not p.exists():
+    original_file = m.get("original_file")
+    if not original_file:
         abort(404)
 
-    return send_file(p, as_attachment=True, download_name=m.get("original_filename") or "original.csv")
+    return send_job_file(WORK_DIR / str(original_file), m.get("original_filename") or "original.csv")
 
 
 @app.get("/download/<job_id>")
 def download(job_id: str):
-    cleanup_old_files()
     m = read_manifest(job_id)
-    op = out_path(job_id)
-    if not m or not op.exists():
+    if not m:
         abort(404)
+    op = out_path(job_id)
 
     delim = m.get("detected_delimiter") or ","
 
     if not PAYMENTS_ENABLED:
-        return send_file(op, as_attachment=True, download_name=cleaned_download_name(delim))
+        return send_job_file(op, cleaned_download_name(delim))
 
     # If a payment session exists but we aren't marked paid yet, avoid bouncing to Stripe again.
     if is_payment_pending(m):
@@ -2571,13 +2037,11 @@ def download(job_id: str):
     if not m.get("paid"):
         return redirect(f"/pay/{job_id}", code=303)
 
-    return send_file(op, as_attachment=True, download_name=cleaned_download_name(delim))
+    return send_job_file(op, cleaned_download_name(delim))
 
 
 @app.get("/pay/<job_id>")
 def pay(job_id: str):
-    cleanup_old_files()
-
     if not PAYMENTS_ENABLED:
         return redirect(f"/download/{job_id}", code=303)
 
@@ -2586,6 +2050,11 @@ def pay(job_id: str):
     if not m or not op.exists():
         abort(404)
 
+    # Reloads reuse the open Checkout session instead of creating another one
+    cached_url = m.get("stripe_session_url")
+    if cached_url and time.time() < (m.get("stripe_session_expires_at") or 0) - 300:
+        return redirect(cached_url, code=303)
+
     session = stripe.checkout.Session.create(
         mode="payment",
         line_items=[{"price": PRICE_ID, "quantity": 1}],
@@ -2596,15 +2065,15 @@ def pay(job_id: str):
 
     # Persist session ID for \"pending\" UX
     m["stripe_session_id"] = session.get("id")
-    manifest_path(job_id).write_text(json.dumps(m, indent=2), encoding="utf-8")
+    m["stripe_session_url"] = session.url
+    m["stripe_session_expires_at"] = session.get("expires_at") or int(time.time()) + 23 * 3600
+    save_manifest(job_id, m)
 
     return redirect(session.url, code=303)
 
 
 @app.get("/success")
 def success():
-    cleanup_old_files()
-
     if not PAYMENTS_ENABLED:
         abort(404)
 
@@ -2613,23 +2082,22 @@ def success():
     if not job_id or not session_id:
         abort(400)
 
+    # The webhook usually lands before the redirect; only ask Stripe when it hasn't
+    m = read_manifest(job_id)
+    if m.get("paid") and m.get("stripe_session_id") == session_id:
+        return render_success(job_id)
+
     sess = stripe.checkout.Session.retrieve(session_id)
     if sess.payment_status == "paid" and (sess.metadata or {}).get("job_id") == job_id:
         mark_paid(job_id, session_id=session_id)
-        return render_template_string(
-            SUCCESS_HTML,
-            job_id=job_id,
-            retention=RETENTION_MINUTES,
-            support_email=SUPPORT_EMAIL,
-        )
+        return render_success(job_id)
 
     return "Payment not confirmed.", 402
 
 
 @app.get("/cancel")
 def cancel():
-    job_id = (request.args.get("job_id") or "").strip()
-    return render_template_string(CANCEL_HTML, job_id=job_id)
+    return CANCEL_PAGE
 
 
 @app.post("/stripe/webhook")
@@ -0,0 +1,11 @@
+"""Imports CleanCSV with its work dir pointed at a throwaway directory."""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault("CLEANCCSV_WORK_DIR", tempfile.mkdtemp(prefix="cleancsv-tests-"))
+os.environ.setdefault("CLEANCCSV_RATE_MAX_UPLOADS", "100000")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import CleanCSV  # noqa: E402
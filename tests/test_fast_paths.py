@@ -0,0 +1,105 @@
+"""
+The pyarrow reader and writer are shortcuts for the csv.reader / to_csv
+paths and must produce exactly what those would. Each case runs the same
+input with and without pyarrow and compares the results.
+"""
+import random
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+from tests.helpers import CleanCSV as C
+
+CELLS = ["a", "1", "", '"q,x"', '"a""b"', '"m\nl"', " s ", 'x"y', "é", '"t"z', "2,5", "\t"]
+WRITE_CHARS = ["a", "B", " ", "é", "€", "x y", "1", "2.5", "", " lead", "trail ", "'", "#", "\\",
+               "\t", ",", ";", "|", '"', "\n", "=", "\u2028", "\x0c"]
+DELIMITERS = [",", ";", "\t", "|"]
+
+
+def random_csv(rng: random.Random, delim: str) -> str:
+    ncol = rng.randint(1, 4)
+    lines = []
+    for _ in range(rng.randint(1, 8)):
+        k = ncol if rng.random() < 0.85 else rng.randint(0, ncol + 2)
+        lines.append(delim.join(rng.choice(CELLS) for _ in range(k)))
+    return "\n".join(lines) + rng.choice(["", "\n"])
+
+
+def random_frame(rng: random.Random) -> pd.DataFrame:
+    n = rng.randint(0, 6)
+    cols = {}
+    for j in range(rng.randint(1, 4)):
+        name = rng.choice(["id", "name", "a b", "x;y", 'Q"', "c"]) + str(j)
+        kind = rng.random()
+        if kind < 0.7:
+            values = ["".join(rng.choices(WRITE_CHARS, k=rng.randint(0, 3))) for _ in range(n)]
+            cols[name] = pd.Series(values, dtype="str")
+        elif kind < 0.85:
+            cols[name] = pd.array([rng.choice([1, -5, None, 10**12]) for _ in range(n)], dtype="Int64")
+        else:
+            cols[name] = pd.Series([rng.randint(-9, 9) for _ in range(n)], dtype="int64")
+    return pd.DataFrame(cols)
+
+
+def read_both(text: str, delim: str):
+    def run():
+        try:
+            return C.read_csv_lenient(text, delim)
+        except ValueError as e:
+            return repr(e)
+
+    fast = run()
+    with mock.patch.object(C, "pa_csv", None):
+        slow = run()
+    return fast, slow
+
+
+@unittest.skipIf(C.pa_csv is None, "pyarrow not installed")
+class ArrowReaderTest(unittest.TestCase):
+    def test_matches_csv_reader(self):
+        rng = random.Random(7)
+        arrow_hits = 0
+        for _ in range(1500):
+            delim = rng.choice(DELIMITERS)
+            text = random_csv(rng, delim)
+            fast, slow = read_both(text, delim)
+            if isinstance(slow, str):
+                self.assertEqual(fast, slow, repr(text))
+                continue
+            arrow_hits += C._read_csv_arrow(text, delim) is not None
+            self.assertEqual(fast[1:], slow[1:], repr(text))
+            self.assertEqual(list(fast[0].columns), list(slow[0].columns), repr(text))
+            self.assertTrue(fast[0].equals(slow[0]), repr(text))
+            self.assertEqual(list(fast[0].dtypes), list(slow[0].dtypes), repr(text))
+        self.assertGreater(arrow_hits, 100)  # the fast path was actually exercised
+
+    def test_blank_lines_and_trailing_newlines(self):
+        for text in ["a,b\n1,2\n3,4\n", "a,b\n1,2\n\n3,4\n", "\na,b\n1,2\n", "a,b\n1,2"]:
+            fast, slow = read_both(text, ",")
+            self.assertEqual(fast[1:], slow[1:], repr(text))
+            self.assertTrue(fast[0].equals(slow[0]), repr(text))
+
+
+@unittest.skipIf(C.pa_csv is None, "pyarrow not installed")
+class ArrowWriterTest(unittest.TestCase):
+    def test_matches_to_csv_bytes(self):
+        rng = random.Random(5)
+        arrow_hits = 0
+        with tempfile.TemporaryDirectory() as d:
+            fast_p, slow_p = Path(d) / "fast.csv", Path(d) / "slow.csv"
+            for _ in range(1500):
+                delim = rng.choice(DELIMITERS)
+                df = random_frame(rng)
+                arrow_hits += C._write_csv_arrow(df, fast_p, delim)
+                C.write_clean_csv(df, fast_p, delim)
+                with mock.patch.object(C, "pa_csv", None):
+                    C.write_clean_csv(df, slow_p, delim)
+                self.assertEqual(fast_p.read_bytes(), slow_p.read_bytes(), (delim, df.to_dict("list")))
+        self.assertGreater(arrow_hits, 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import sys
+import unittest
+
+import pandas as pd
+
+from tests.helpers import CleanCSV as C
+
+# Every character str.split() treats as whitespace
+SPACES = "".join(ch for ch in map(chr, range(sys.maxunicode + 1)) if ch.isspace())
+
+
+class CompareNormalizationTest(unittest.TestCase):
+    """Near-dupe comparison must collapse exactly what ' '.join(x.split()) did."""
+
+    def test_matches_str_split(self):
+        values = [f"a{ch}B{ch}{ch}c{ch}" for ch in SPACES] + [f"{ch}x" for ch in SPACES]
+        expected = [" ".join(v.split()).lower() for v in values]
+        for dtype in ("str", object):
+            with self.subTest(dtype=dtype):
+                got = C._normalize_text_for_compare(pd.Series(values, dtype=dtype))
+                self.assertEqual(got.tolist(), expected)
+
+    def test_vertical_tab_counts_as_space(self):
+        df = pd.DataFrame({"name": ["Acme\x0bCorp", "acme corp", "x\x0b", "x"]}, dtype="str")
+        _, count, _, mask = C.analyze_near_duplicates(df)
+        self.assertEqual(count, 2)
+        self.assertEqual(mask.tolist(), [False, True, False, True])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import io
+import re
+import unittest
+
+from tests.helpers import CleanCSV as C
+
+
+def upload(data: bytes, name: str = "data.csv") -> dict:
+    client = C.app.test_client()
+    r = client.post("/upload", data={"file": (io.BytesIO(data), name)}, content_type="multipart/form-data")
+    job_id = re.search(r"/download/([0-9a-f]+)", r.get_data(as_text=True)).group(1)
+    return C.read_manifest(job_id)
+
+
+class TrailingBlankLineTest(unittest.TestCase):
+    def test_preamble_detection_drops_trailing_blank_lines(self):
+        text, _, _ = C.detect_and_strip_preamble("a,b\n1,2\n3,4\n\n\n", ",")
+        self.assertEqual(text, "a,b\n1,2\n3,4\n")
+
+    def test_trailing_blank_line_is_not_an_import_repair(self):
+        m = upload(b"a,b\n1,2\n3,4\n\n")
+        self.assertFalse(m["import_warning"])
+        self.assertEqual(m["rows"], 2)
+        self.assertIn("Row structure was consistent (no import repairs needed).", m["changelog"])
+        self.assertIn("No fully empty rows found.", m["changelog"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import io
+import os
+import unittest
+
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+from tests.helpers import CleanCSV as C
+
+
+def raw_files() -> set[str]:
+    return {name for name in os.listdir(C.WORK_DIR) if name.endswith(".raw")}
+
+
+class UploadFileTest(unittest.TestCase):
+    def test_file_after_another_file_part(self):
+        before = raw_files()
+        r = C.app.test_client().post(
+            "/upload",
+            data={"other": (io.BytesIO(b"zzz"), "o.txt"), "file": (io.BytesIO(b"a,b\n1,2\n"), "x.csv")},
+            content_type="multipart/form-data",
+        )
+        self.assertEqual(r.status_code, 200)
+        (new,) = raw_files() - before
+        self.assertEqual((C.WORK_DIR / new).read_bytes(), b"a,b\n1,2\n")
+
+    def test_oversized_body_without_content_length_leaves_no_raw_file(self):
+        before = raw_files()
+        body = b"a,b\n" + b"1,2\n" * 100_000
+        env = EnvironBuilder(method="POST", path="/upload", data={"file": (io.BytesIO(body), "x.csv")}).get_environ()
+        del env["CONTENT_LENGTH"]
+        env["wsgi.input_terminated"] = True  # like a chunked request: the limit trips mid-parse
+        old_limit = C.app.config["MAX_CONTENT_LENGTH"]
+        C.app.config["MAX_CONTENT_LENGTH"] = 100_000
+        try:
+            _, status, _ = run_wsgi_app(C.app, env)
+        finally:
+            C.app.config["MAX_CONTENT_LENGTH"] = old_limit
+        self.assertTrue(status.startswith("413"))
+        self.assertEqual(raw_files(), before)
+
+
+if __name__ == "__main__":
+    unittest.main()